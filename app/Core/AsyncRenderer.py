@@ -0,0 +1,207 @@
+import math
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QPainter, QPixmap, QImage
+
+
+# Renderer of widget frames into QImages on the worker threads of a QThreadPool, so that paint events of the GUI thread
+# only blit finished images. Asynchronous rendering is opt-in and must be enabled before widgets are created.
+# Note: PyQt holds the GIL during each Qt call, so workers do not render in parallel to Python code of the GUI thread.
+# But the GUI thread gets the GIL between two calls of a worker (after at most the switch interval, see main.py), so
+# input events are handled while frames are rendered instead of waiting until all widgets have been painted. For the
+# same reason, more than one worker thread only adds contention for the GIL.
+class AsyncRenderer:
+    def __init__(self):
+        self.enabled = False
+        self.pool = None
+
+    # enable asynchronous rendering with at most max_threads worker threads
+    def enable(self, max_threads=1):
+        self.enabled = True
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(1, int(max_threads)))
+
+    # discard all frames that have not been started yet and wait for the workers, e.g. before the application exits
+    def stop(self):
+        if self.pool is not None:
+            self.pool.clear()
+            self.pool.waitForDone()
+
+
+# Job that renders the frames of one widget: at most one frame is rendered at a time, a frame that is requested meanwhile
+# replaces any other pending frame and is rendered next. Finished frames are delivered in the GUI thread by the finished
+# signal as (key, image).
+# Note: render(*args) is called on a worker thread and must return a QImage. It must not access the widget, all state
+# (e.g. values, colors and cached static layers as QImage) is passed as arguments.
+class RenderJob(QObject):
+    finished = pyqtSignal(object, object)
+    _done = pyqtSignal(object, object)
+
+    def __init__(self, render, parent=None):
+        super().__init__(parent)
+        self.__render = render
+        self.__runnable = None
+        self.__pending = None
+        self.__requestedKey = None
+        self._done.connect(self.__onDone)
+
+    # request to render a frame identified by key with the given arguments, if it has not been requested before
+    def request(self, key, *args):
+        if key == self.__requestedKey:
+            return
+        self.__requestedKey = key
+        if self.__runnable is None:
+            self.__start(key, args)
+        else:
+            self.__pending = (key, args)
+
+    def __start(self, key, args):
+        self.__runnable = _RenderRunnable(self, key, self.__render, args)
+        asyncRenderer.pool.start(self.__runnable)
+
+    # Note: called in the GUI thread once a frame has been rendered
+    def __onDone(self, key, image):
+        self.__runnable = None
+        if self.__pending is not None:
+            pending, self.__pending = self.__pending, None
+            self.__start(*pending)
+        if image is not None:
+            self.finished.emit(key, image)
+
+
+class _RenderRunnable(QRunnable):
+    def __init__(self, job, key, render, args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.__job = job
+        self.__key = key
+        self.__render = render
+        self.__args = args
+
+    def run(self):
+        try:
+            image = self.__render(*self.__args)
+        except Exception:
+            image = None
+        self.__job._done.emit(self.__key, image)
+
+
+# Mixin for widgets that are painted in three layers: a static background and a static foreground, which are cached,
+# and a dynamic overlay between them, which is painted for the current state. If asynchronous rendering is enabled,
+# frames are rendered by a worker thread and paint events only blit the latest rendered frame.
+# The widget calls LayeredWidget.__init__() in its constructor, invalidateStaticLayers() after a property of the static
+# layers changed and requestFrame() after its input values changed. It provides the following methods:
+#   computeGeometry(width, height): get the geometry (e.g. radii and line widths) that is passed to all paint methods
+#   getStaticLayersKey(): get all properties of the static layers except the size, e.g. their colors
+#   paintBackground(painter, geometry), paintForeground(painter, geometry): paint the static layers
+#   getOverlayState(): get the state of the overlay, e.g. values and colors
+#   paintOverlay(painter, geometry, state): paint the overlay, only the arguments may be used (see RenderJob)
+# Note: the mixin must precede QWidget in the base classes, so that its paintEvent() and resizeEvent() are used.
+class LayeredWidget:
+    def __init__(self):
+        # cached static layers (background below and foreground above the overlay) and their geometry
+        self.__staticLayersKey = None
+        self.__staticLayers = None
+
+        # Note: the static layers are images for asynchronous rendering, pixmaps must not be used outside of the GUI thread.
+        self.__renderJob = None
+        self.__renderedKey = None
+        self.__renderedImage = None
+        if asyncRenderer.enabled:
+            self.__renderJob = RenderJob(self.__renderFrame, self)
+            self.__renderJob.finished.connect(self.__onFrameRendered)
+            self.repaintOnInput = False
+
+    # drop the cached static layers, e.g. if a color changed
+    def invalidateStaticLayers(self):
+        self.__staticLayersKey = None
+        self.__staticLayers = None
+        self.update()
+
+    def resizeEvent(self, e):
+        self.__staticLayersKey = None
+        self.__staticLayers = None
+        super().resizeEvent(e)
+
+    # get the static layers for the current size, device pixel ratio and properties, render them if not cached
+    def __getStaticLayers(self):
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr) + tuple(self.getStaticLayersKey())
+        if key != self.__staticLayersKey:
+            geometry = self.computeGeometry(self.width(), self.height())
+            background = self.__createLayer(dpr)
+            painter = QPainter(background)
+            self.paintBackground(painter, geometry)
+            painter.end()
+            foreground = self.__createLayer(dpr)
+            painter = QPainter(foreground)
+            self.paintForeground(painter, geometry)
+            painter.end()
+            self.__staticLayersKey = key
+            self.__staticLayers = (background, foreground, geometry)
+        return self.__staticLayers
+
+    # create a transparent pixmap (or image for asynchronous rendering) with the size of the widget
+    def __createLayer(self, dpr):
+        size = (max(1, math.ceil(self.width() * dpr)), max(1, math.ceil(self.height() * dpr)))
+        layer = QPixmap(*size) if self.__renderJob is None else QImage(*size, QImage.Format_ARGB32_Premultiplied)
+        layer.setDevicePixelRatio(dpr)
+        layer.fill(Qt.transparent)
+        return layer
+
+    # render a frame into an image: static background, dynamic overlay and static foreground
+    # Note: this is called by a worker thread of the asynchronous renderer, only the arguments are used.
+    def __renderFrame(self, background, foreground, geometry, state):
+        image = QImage(background.size(), QImage.Format_ARGB32_Premultiplied)
+        image.setDevicePixelRatio(background.devicePixelRatio())
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.drawImage(0, 0, background)
+        self.paintOverlay(painter, geometry, state)
+        painter.drawImage(0, 0, foreground)
+        painter.end()
+        return image
+
+    # request to render a frame for the current state if asynchronous rendering is enabled, the widget is repainted once
+    # the frame has been rendered
+    def requestFrame(self):
+        if self.__renderJob is not None:
+            self.__requestFrame()
+
+    # Note: the first frame after a change of the static layers (e.g. a resize) is rendered in the GUI thread.
+    def __requestFrame(self, repaint=True):
+        background, foreground, geometry = self.__getStaticLayers()
+        key = (self.__staticLayersKey, self.getOverlayState())
+        if key == self.__renderedKey:
+            return
+        if self.__renderedKey is None or self.__renderedKey[0] != key[0]:
+            self.__renderedKey = key
+            self.__renderedImage = self.__renderFrame(background, foreground, geometry, key[1])
+            if repaint:
+                self.update()
+        else:
+            self.__renderJob.request(key, background, foreground, geometry, key[1])
+
+    def __onFrameRendered(self, key, image):
+        if key[0] == self.__staticLayersKey:
+            self.__renderedKey = key
+            self.__renderedImage = image
+            self.update()
+
+    def paintEvent(self, e):
+        # blit the latest rendered frame, a frame for a changed state (e.g. a color) is requested
+        if self.__renderJob is not None:
+            self.__requestFrame(repaint=False)
+            painter = QPainter(self)
+            painter.drawImage(0, 0, self.__renderedImage)
+            return
+
+        # blit the cached static background, paint the dynamic overlay and blit the cached static foreground
+        background, foreground, geometry = self.__getStaticLayers()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, background)
+        self.paintOverlay(painter, geometry, self.getOverlayState())
+        painter.drawPixmap(0, 0, foreground)
+
+
+# global asynchronous renderer instance
+asyncRenderer = AsyncRenderer()
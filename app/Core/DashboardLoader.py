@@ -0,0 +1,86 @@
+import json
+from PyQt5.QtWidgets import QGridLayout
+from Core.MainDashboard import MainDashboard
+
+# YAML descriptions are optional and require PyYAML
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+# Build a dashboard from a description (dictionary), e.g. loaded from a JSON or YAML file:
+#   title:      window title (optional)
+#   spacing:    spacing of the grid layout in pixels (optional, default: 0)
+#   margins:    contents margins of the grid layout in pixels (optional, default: 0)
+#   widgets:    list of widgets in the order of the memory layout, each with
+#     type:       class name of the widget, e.g. PushButton
+#     name:       attribute name of the widget in the dashboard (optional)
+#     args:       list of positional constructor arguments (optional)
+#     kwargs:     dictionary of keyword constructor arguments (optional)
+#     row, column, rowSpan, columnSpan: position in the grid layout (optional, default: next row, first column)
+#   pages:      list of pages of a tabbed dashboard instead of widgets, each with a title, an optional scrollable flag
+#               and its own spacing, margins and widgets (the memory layout follows the order of pages and widgets)
+# Note: an argument {"widget": <name>} is replaced by the previously defined widget with that name, e.g. the source of
+# a StripChart is given as [{"widget": "rudderPlot"}, "actualAngle"].
+def buildDashboard(description, parent=None):
+    dashboard = MainDashboard(parent)
+    if 'title' in description:
+        dashboard.setWindowTitle(str(description['title']))
+    widgets = {}
+    if 'pages' in description:
+        for page in description['pages']:
+            _addWidgets(dashboard, dashboard.addPage(str(page.get('title', '')), bool(page.get('scrollable', False))), page, widgets)
+    else:
+        _addWidgets(dashboard, dashboard, description, widgets)
+    return dashboard
+
+
+# create all widgets of a description in a grid layout of the container and add named widgets to the dashboard
+def _addWidgets(dashboard, container, description, widgets):
+    import DashboardWidgets
+    layout = QGridLayout(container)
+    layout.setSpacing(int(description.get('spacing', 0)))
+    margins = int(description.get('margins', 0))
+    layout.setContentsMargins(margins, margins, margins, margins)
+    for index, entry in enumerate(description.get('widgets', [])):
+        type_name = entry.get('type')
+        cls = getattr(DashboardWidgets, str(type_name), None)
+        if not isinstance(cls, type):
+            raise ValueError("Unknown widget type '" + str(type_name) + "' of widget " + str(index))
+        name = entry.get('name')
+        if name is not None and (name in widgets or hasattr(dashboard, name)):
+            raise ValueError("Widget name '" + str(name) + "' is not unique or reserved")
+        args = [_resolveWidgets(arg, widgets) for arg in entry.get('args', [])]
+        kwargs = {key: _resolveWidgets(value, widgets) for key, value in entry.get('kwargs', {}).items()}
+        widget = cls(*args, **kwargs)
+        if name is not None:
+            widgets[name] = widget
+            widget.setObjectName(name)
+            setattr(dashboard, name, widget)
+        layout.addWidget(widget, int(entry.get('row', index)), int(entry.get('column', 0)), int(entry.get('rowSpan', 1)), int(entry.get('columnSpan', 1)))
+
+
+# Load a dashboard from a JSON (.json) or YAML (.yaml, .yml) file, see buildDashboard() for the description format.
+def loadDashboard(filename, parent=None):
+    with open(filename, 'r') as f:
+        if str(filename).lower().endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ImportError("Loading '" + str(filename) + "' requires PyYAML (pip install pyyaml)")
+            description = yaml.safe_load(f)
+        else:
+            description = json.load(f)
+    if not isinstance(description, dict):
+        raise ValueError("'" + str(filename) + "' does not contain a dashboard description")
+    return buildDashboard(description, parent)
+
+
+# replace all {"widget": <name>} references in an argument by the widget
+def _resolveWidgets(value, widgets):
+    if isinstance(value, dict) and set(value) == {'widget'}:
+        if value['widget'] not in widgets:
+            raise ValueError("Unknown widget '" + str(value['widget']) + "'")
+        return widgets[value['widget']]
+    if isinstance(value, (list, tuple)):
+        return type(value)(_resolveWidgets(item, widgets) for item in value)
+    return value
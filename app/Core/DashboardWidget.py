@@ -1,20 +1,35 @@
+import time
 from PyQt5.QtWidgets import QSizePolicy
 from abc import abstractmethod
-from Core import *
+from Core.DataField import compileDataFields
 from Core.Datastore import datastore
+from Core.Metrics import metrics
 
 
 class DashboardWidget:
+    # declarative description of the binary input and output data, given as lists of DataField
+    inputFields = []
+    outputFields = []
+
+    # the widget is repainted entirely after its input data changed, widgets that schedule repaints of changed parts
+    # themselves set this to False
+    repaintOnInput = True
+
     def __init__(self):
         self.offsetInputData = 0
         self.offsetOutputData = 0
+        self.inputGeneration = 0
+        self.inputValues = None
+        self.inputCodec = compileDataFields(tuple(self.inputFields))
+        self.outputCodec = compileDataFields(tuple(self.outputFields))
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         datastore.addWidget(self)
+        metrics.instrumentWidget(self)
 
     # get memory size for input and output data
-    @abstractmethod
+    # Note: the default implementation uses the sizes of the declared input and output fields.
     def requiredIODatastoreSize(self):
-        pass
+        return (self.inputCodec.size, self.outputCodec.size)
 
     # serialize output data to bytes
     @abstractmethod
@@ -22,18 +37,57 @@ class DashboardWidget:
         pass
 
     # deserialize input data from bytes
-    @abstractmethod
+    # Note: the default implementation unpacks the declared input fields and passes their values to unpackInputValues().
     def unpackInput(self, data):
+        if len(data) == self.inputCodec.size:
+            self.unpackInputValues(self.inputCodec.unpack(data))
+
+    # set the input data from a list with one value per declared input field, values are clamped to their range
+    def unpackInputValues(self, values):
         pass
 
     # update the widget from the datastore
-    def updateFromDatastore(self):
-        data_size = self.requiredIODatastoreSize()
-        input_size = data_size[0]
-        output_size = data_size[1]
-        input_data = datastore.read_input(self.offsetInputData, input_size)
+    # Note: snapshot is an optional view returned by datastore.snapshot_input() and generation is the input generation
+    # of the datastore that is consumed by this update.
+    def updateFromDatastore(self, snapshot=None, generation=None):
+        if generation is not None:
+            self.inputGeneration = generation
+        if metrics.enabled:
+            t0 = time.perf_counter()
+            self.__unpackFromDatastore(snapshot)
+            metrics.recordUnpack(self, time.perf_counter() - t0)
+        else:
+            self.__unpackFromDatastore(snapshot)
+        if self.repaintOnInput:
+            self.update()
+
+    # Note: if the snapshot has been decoded by the datastore (see datastore.enable_decoding()), widgets that do not
+    # override unpackInput() read their values from the typed view inputValues instead of unpacking bytes.
+    def __unpackFromDatastore(self, snapshot):
+        if snapshot is not None and self.inputValues is not None and type(self).unpackInput is DashboardWidget.unpackInput:
+            self.unpackInputValues(self.inputCodec.unpackView(self.inputValues))
+            return
+        input_size = self.requiredIODatastoreSize()[0]
+        if snapshot is None:
+            input_data = datastore.read_input(self.offsetInputData, input_size)
+            if input_data is None:
+                return
+        else:
+            input_data = snapshot[self.offsetInputData:self.offsetInputData + input_size]
         self.unpackInput(input_data)
+
+    # write the output data of the widget to the datastore
+    def updateOutputToDatastore(self):
+        output_size = self.requiredIODatastoreSize()[1]
+        if not output_size:
+            return
         output_data = self.packOutput()
         if len(output_data) == output_size:
             datastore.write_output(self.offsetOutputData, output_data)
-        self.update()
+
+    # write the output data of the widget to the datastore and request an immediate send instead of waiting for the next
+    # output tick, e.g. after a user interaction like pressing a button
+    # Note: immediate sends are rate limited by the network manager, requests in between are sent together.
+    def requestOutput(self):
+        self.updateOutputToDatastore()
+        datastore.request_output()
@@ -0,0 +1,132 @@
+import functools
+import struct
+from collections import namedtuple
+
+
+# supported data types of fields and their format characters for the struct module
+FIELD_TYPES = {
+    'int8': 'b',
+    'uint8': 'B',
+    'int16': 'h',
+    'uint16': 'H',
+    'int32': 'i',
+    'uint32': 'I',
+    'float32': 'f',
+    'float64': 'd'
+}
+
+
+# Description of one field in the binary input or output data of a widget.
+# A field consists of count values of type dtype. Values are clamped to [minimum, maximum] when unpacked, if given, each
+# value of a field with count > 1 is clamped on its own.
+class DataField(namedtuple('DataField', ['name', 'dtype', 'count', 'minimum', 'maximum'], defaults=(1, None, None))):
+    __slots__ = ()
+
+
+# Binary codec for a list of fields, compiled once into a struct.Struct with machine byte-order and no padding.
+class DataFieldCodec:
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        for field in self.fields:
+            if field.dtype not in FIELD_TYPES:
+                raise ValueError("Unknown data type '" + str(field.dtype) + "' of field '" + str(field.name) + "'")
+        self.__struct = struct.Struct('=' + ''.join(str(field.count) + FIELD_TYPES[field.dtype] for field in self.fields))
+        self.size = self.__struct.size
+
+        # byte offset of each field and index range of each field in the flat tuple of struct values
+        self.offsets = []
+        self.__slices = []
+        offset = 0
+        index = 0
+        for field in self.fields:
+            self.offsets.append(offset)
+            self.__slices.append((index, index + field.count))
+            offset += field.count * struct.calcsize(FIELD_TYPES[field.dtype])
+            index += field.count
+
+        # clamp ranges of scalar fields and of fields with count > 1 (clamped element-wise) as (index, minimum, maximum)
+        clamps = [(i, field) for i, field in enumerate(self.fields) if field.minimum is not None or field.maximum is not None]
+        self.__clamps = [(i, field.minimum, field.maximum) for i, field in clamps if field.count == 1]
+        self.__array_clamps = [(i, field.minimum, field.maximum) for i, field in clamps if field.count != 1]
+        self.__is_flat = all(field.count == 1 for field in self.fields)
+        self.__array_fields = [i for i, field in enumerate(self.fields) if field.count != 1]
+        self.__numpy_type = None
+
+    # get the numpy structured data type of the fields, e.g. to view the fields in a buffer without unpacking
+    # Note: numpy is only imported on first use.
+    def numpyType(self):
+        if self.__numpy_type is None:
+            import numpy as np
+            self.__numpy_type = np.dtype({
+                'names': [field.name for field in self.fields],
+                'formats': ['=' + FIELD_TYPES[field.dtype] if field.count == 1 else ('=' + FIELD_TYPES[field.dtype], (field.count,)) for field in self.fields],
+                'offsets': self.offsets,
+                'itemsize': self.size
+            })
+        return self.__numpy_type
+
+    # get the values of a typed view (see numpyType()) as a list with one entry per field, fields with count > 1 are
+    # returned as tuples
+    # Note: the values are not clamped, the view is expected to contain clamped values already.
+    def unpackView(self, view):
+        values = list(view.item())
+        if not self.__is_flat:
+            for i in self.__array_fields:
+                values[i] = tuple(values[i].tolist())
+        return values
+
+    # unpack bytes to a list with one entry per field, fields with count > 1 are returned as tuples
+    def unpack(self, data, offset=0):
+        values = self.__struct.unpack_from(data, offset)
+        if self.__is_flat:
+            values = list(values)
+        else:
+            values = [values[a] if b - a == 1 else values[a:b] for a, b in self.__slices]
+        for i, minimum, maximum in self.__clamps:
+            if minimum is not None and values[i] < minimum:
+                values[i] = minimum
+            elif maximum is not None and values[i] > maximum:
+                values[i] = maximum
+        for i, minimum, maximum in self.__array_clamps:
+            array = values[i]
+            if minimum is not None:
+                array = tuple(minimum if value < minimum else value for value in array)
+            if maximum is not None:
+                array = tuple(maximum if value > maximum else value for value in array)
+            values[i] = array
+        return values
+
+    # pack one value per field to bytes, fields with count > 1 expect a sequence of values
+    def pack(self, *values):
+        if self.__is_flat:
+            return bytearray(self.__struct.pack(*values))
+        flat = []
+        for field, value in zip(self.fields, values):
+            if field.count == 1:
+                flat.append(value)
+            else:
+                flat.extend(value)
+        return bytearray(self.__struct.pack(*flat))
+
+    # get the layout of all fields as a list of dictionaries starting at the given base offset
+    def layout(self, base_offset=0):
+        layout = []
+        for field, offset in zip(self.fields, self.offsets):
+            entry = {
+                'name': field.name,
+                'type': field.dtype,
+                'offset': base_offset + offset,
+                'count': field.count
+            }
+            if field.minimum is not None:
+                entry['minimum'] = field.minimum
+            if field.maximum is not None:
+                entry['maximum'] = field.maximum
+            layout.append(entry)
+        return layout
+
+
+# get a compiled codec for the given fields, codecs for identical field lists are shared
+@functools.lru_cache(maxsize=None)
+def compileDataFields(fields):
+    return DataFieldCodec(fields)
@@ -0,0 +1,166 @@
+import bisect
+import mmap
+import struct
+import threading
+import time
+from Core.Datastore import datastore
+
+
+# identification of a datagram log file (magic bytes and format version)
+LOG_MAGIC = b'PGLOG\x00\x02\x00'
+
+# header of each record: monotonic timestamp in nanoseconds since start of the recording (uint64), length (uint32),
+# index of the endpoint that received the datagram (uint16), followed by the received datagram (offset address and
+# payload)
+RECORD_HEADER = struct.Struct('=QIH')
+
+# log files of format version 1 have no endpoint index, all datagrams are replayed to the first endpoint
+LOG_MAGIC_V1 = b'PGLOG\x00\x01\x00'
+RECORD_HEADER_V1 = struct.Struct('=QI')
+
+# number of records between two entries of the sparse index
+INDEX_INTERVAL = 256
+
+
+# Append-only log of received datagrams with monotonic timestamps.
+# Records are written to a large file buffer, so that recording does not stall the receive loop.
+class DatagramRecorder:
+    def __init__(self, filename, buffer_size=1 << 20):
+        self.filename = filename
+        self.numRecords = 0
+        self.__lock = threading.Lock()
+        self.__file = open(filename, 'wb', buffering=buffer_size)
+        self.__file.write(LOG_MAGIC)
+        self.__startTime = time.monotonic_ns()
+
+    # append one datagram that was received by the endpoint with the given index to the log
+    def record(self, datagram, endpoint=0):
+        with self.__lock:
+            if self.__file is None:
+                return
+            self.__file.write(RECORD_HEADER.pack(time.monotonic_ns() - self.__startTime, len(datagram), endpoint))
+            self.__file.write(datagram)
+            self.numRecords += 1
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+
+# Thread that replays a datagram log through a datagram parser into the datastore.
+# The log is memory-mapped and a sparse index of (timestamp, file position) allows seeking.
+# Note: parse is a function (endpoint, datagram, source, segments) that appends (offset, bytes) segments of a datagram
+# that was received by the endpoint with the given index, e.g. the parseEndpointDatagram() method of a network manager
+# with the same endpoints as the recording. A speed of 1.0 replays in real-time, 0 replays as fast as possible.
+class DatagramReplayer(threading.Thread):
+    def __init__(self, filename, parse, speed=1.0, loop=False):
+        super().__init__(daemon=True)
+        self.filename = filename
+        self.parse = parse
+        self.speed = float(speed)
+        self.loop = bool(loop)
+        self.replayedRecords = 0
+        self._running = threading.Event()
+        self._running.set()
+        self.__seekEvent = threading.Event()
+        self.__seekTime = None
+        with open(filename, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = self.__map[:len(LOG_MAGIC)]
+        if magic not in (LOG_MAGIC, LOG_MAGIC_V1):
+            self.__map.close()
+            raise ValueError("'" + str(filename) + "' is not a datagram log file")
+        self.__header = RECORD_HEADER if magic == LOG_MAGIC else RECORD_HEADER_V1
+        self.__indexTimes, self.__indexPositions, self.duration = self.__buildIndex()
+
+    # scan all record headers and return the sparse index and the duration of the log in seconds
+    def __buildIndex(self):
+        index_times = []
+        index_positions = []
+        position = len(LOG_MAGIC)
+        timestamp = 0
+        count = 0
+        size = len(self.__map)
+        while position + self.__header.size <= size:
+            timestamp, length = self.__header.unpack_from(self.__map, position)[:2]
+            if position + self.__header.size + length > size:
+                break
+            if count % INDEX_INTERVAL == 0:
+                index_times.append(timestamp)
+                index_positions.append(position)
+            position += self.__header.size + length
+            count += 1
+        self.__end = position
+        return index_times, index_positions, timestamp / 1e9
+
+    # find the position of the first record with a timestamp of at least the given time in seconds
+    def __findPosition(self, seconds):
+        timestamp = int(seconds * 1e9)
+        i = bisect.bisect_right(self.__indexTimes, timestamp) - 1
+        if i < 0:
+            return len(LOG_MAGIC)
+        position = self.__indexPositions[i]
+        while position < self.__end:
+            record_time, length = self.__header.unpack_from(self.__map, position)[:2]
+            if record_time >= timestamp:
+                break
+            position += self.__header.size + length
+        return position
+
+    # continue the replay at the given time in seconds since start of the recording
+    def seek(self, seconds):
+        self.__seekTime = max(0.0, float(seconds))
+        self.__seekEvent.set()
+
+    # thread entry point: replay all records with their original timing scaled by the speed
+    def run(self):
+        view = memoryview(self.__map)
+        position = len(LOG_MAGIC)
+        start_wall = time.perf_counter()
+        start_log = None
+        while self._running.is_set():
+            if self.__seekTime is not None:
+                position = self.__findPosition(self.__seekTime)
+                self.__seekTime = None
+                self.__seekEvent.clear()
+                start_log = None
+            if position >= self.__end:
+                if not self.loop:
+                    break
+                position = len(LOG_MAGIC)
+                start_log = None
+                continue
+            timestamp = self.__header.unpack_from(self.__map, position)[0]
+            if start_log is None:
+                start_wall = time.perf_counter()
+                start_log = timestamp
+
+            # wait until the record is due, a seek request interrupts waiting
+            if self.speed > 0:
+                delay = start_wall + (timestamp - start_log) / 1e9 / self.speed - time.perf_counter()
+                if delay > 0 and self.__seekEvent.wait(delay):
+                    continue
+
+            # replay all records with the same timestamp as one batch
+            segments = []
+            ends = []
+            while position < self.__end:
+                record = self.__header.unpack_from(self.__map, position)
+                record_time, length = record[:2]
+                if record_time != timestamp:
+                    break
+                endpoint = record[2] if len(record) > 2 else 0
+                start = position + self.__header.size
+                self.parse(endpoint, view[start:start + length], self.filename, segments)
+                ends.append(len(segments))
+                position = start + length
+                self.replayedRecords += 1
+            if segments:
+                datastore.write_input_batch(segments, ends)
+        view.release()
+
+    def stop(self):
+        self._running.clear()
+        self.__seekEvent.set()
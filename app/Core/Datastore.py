@@ -1,18 +1,92 @@
+import bisect
+import hashlib
+import json
+import os
+import struct
 import threading
+import time
+from Core.DataField import FIELD_TYPES
+
+
+# number of optimistic read attempts before a reader falls back to the writer lock
+MAX_READ_RETRIES = 8
+
+# header of the shared memory: magic bytes, input and output sequence numbers (uint64), number of input regions, input
+# size, output size, layout hash and number of history channels (uint32), followed by region offsets and ends (uint32),
+# generations (uint64), input and output data and (aligned to 8 bytes) the history channels
+SHARED_MEMORY_MAGIC = b'PGSHM\x00\x03\x00'
+SHARED_MEMORY_HEADER = struct.Struct('=8sQQIIIII')
+
+# entry of a history channel in shared memory: input offset, capacity (uint32) and data type name, the entries of all
+# channels are followed by the buffers of all channels
+HISTORY_CHANNEL_ENTRY = struct.Struct('=II8s')
+
+
+# Lock that accumulates the time (in seconds) spent waiting for it.
+class TimedLock:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.wait_time = 0.0
+
+    def __enter__(self):
+        if not self.__lock.acquire(blocking=False):
+            t0 = time.perf_counter()
+            self.__lock.acquire()
+            self.wait_time += time.perf_counter() - t0
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__lock.release()
 
 
 # Global storage for application state with thread-safe access.
+# Note: input data is protected by a sequence lock. Writers serialize on the input lock and make the sequence number odd
+# while writing, readers never take the lock but copy the data and retry if the sequence number changed meanwhile. Thus,
+# the receiver never waits for the GUI and readers always get the state after a complete write (batch).
+# The datastore can be moved to shared memory, so that another process, e.g. a receiver process, can write input data
+# and read output data, see share_memory() and attach_shared_memory().
 class Datastore:
     def __init__(self):
-        self.__input_lock = threading.Lock()
+        self.__input_lock = TimedLock()
+        self.__sequences = memoryview(bytearray(16)).cast('Q')  # input and output sequence numbers
+        self.__read_retries = 0
+        self.__shared_memory = None
+        self.__display_only = False
         self.__input_data_size = 0
         self.__input_data = bytearray(self.__input_data_size)
+        self.__output_lock = threading.Lock()
+        self.__output_request_events = []
         self.__output_data_size = 0
         self.__output_data = bytearray(self.__output_data_size)
+        self.__unallocated = False
+        self.__layout_text = None
+        self.__layout_hash = None
         self.widgets = []
 
-    # add a new widget and allocate IO memory
+        # input regions of all widgets (sorted by offset) and their generation counters
+        self.__input_region_offsets = []
+        self.__input_region_ends = []
+        self.__input_generations = []
+
+        # history channels of input fields that are captured on each write
+        self.__history_channels = []
+
+        # snapshot of the input data and generation counters, taken once per tick
+        self.__input_snapshot = bytearray(0)
+        self.__spare_snapshot = bytearray(0)
+        self.__snapshot_generations = []
+
+        # decoder of the snapshot into clamped typed views of the input fields of all widgets, see enable_decoding()
+        self.__decoding = False
+        self.__decoder = None
+        self.__decoded_input = None
+        self.__out_of_range_count = 0
+
+    # add a new widget and assign its IO memory offsets
+    # Note: IO memory is allocated once for all widgets by allocate(), which is called on first access of the data.
     def addWidget(self, widget):
+        if self.__shared_memory is not None:
+            raise RuntimeError("Widgets cannot be added after the datastore has been moved to shared memory")
         self.widgets.append(widget)
 
         # required memory size for input and output data
@@ -20,46 +94,477 @@ class Datastore:
         input_size = data_size[0]
         output_size = data_size[1]
 
-        # add widget to input data
-        widget.offsetInputData = self.__input_data_size
-        self.__input_data.extend(bytearray(input_size))
-        self.__input_data_size += input_size
+        # assign offsets of input and output data
+        with self.__input_lock, self.__output_lock:
+            widget.offsetInputData = self.__input_data_size
+            widget.offsetOutputData = self.__output_data_size
+            self.__input_data_size += input_size
+            self.__output_data_size += output_size
+
+            # register input region, the initial generation marks the widget as changed
+            self.__input_region_offsets.append(widget.offsetInputData)
+            self.__input_region_ends.append(widget.offsetInputData + input_size)
+            self.__input_generations.append(1)
+            self.__unallocated = True
+            self.__decoder = None
+            self.__layout_text = None
+            self.__layout_hash = None
+
+    # allocate input and output data for all widgets with one allocation each, existing data is kept
+    def allocate(self):
+        with self.__input_lock, self.__output_lock:
+            self.__allocate()
 
-        # add widget to output data
-        widget.offsetOutputData = self.__output_data_size
-        self.__output_data.extend(bytearray(output_size))
-        self.__output_data_size += output_size
+    # Note: must be called while holding the input and output lock.
+    def __allocate(self):
+        if not self.__unallocated:
+            return
+        input_data = bytearray(self.__input_data_size)
+        input_data[:len(self.__input_data)] = self.__input_data
+        self.__input_data = input_data
+        output_data = bytearray(self.__output_data_size)
+        output_data[:len(self.__output_data)] = self.__output_data
+        self.__output_data = output_data
+        self.__unallocated = False
 
     # write bytes to input data at given offset
     def write_input(self, offset, data_bytes):
+        self.write_input_batch(((offset, data_bytes),))
+
+    # write a batch of (offset, bytes) segments to input data as one atomic update for readers
+    # Note: ends is the ascending list of the number of segments after each datagram of the batch (None: the batch is one
+    # datagram). History channels are captured once after the segments of each datagram have been written, so that a field
+    # that is split across several segments is only captured as a whole, but no datagram of the batch is missed.
+    def write_input_batch(self, segments, ends=None):
+        if self.__unallocated:
+            self.allocate()
         with self.__input_lock:
-            if offset < 0 or offset >= self.__input_data_size:
-                return
-            end = min(offset + len(data_bytes), self.__input_data_size)
-            self.__input_data[offset:end] = data_bytes[:end - offset]
+            self.__sequences[0] += 1
+            try:
+                if not self.__history_channels:
+                    for offset, data_bytes in segments:
+                        self.__write_input(offset, data_bytes)
+                else:
+                    start = 0
+                    for end in (len(segments),) if ends is None else ends:
+                        ranges = [self.__write_input(offset, data_bytes) for offset, data_bytes in segments[start:end]]
+                        self.__capture_history([written for written in ranges if written is not None])
+                        start = end
+            finally:
+                self.__sequences[0] += 1
+
+    # write bytes to input data and return the written range (offset, end), or None if the offset is out of range
+    # Note: must be called while holding the input lock.
+    def __write_input(self, offset, data_bytes):
+        if offset < 0 or offset >= self.__input_data_size:
+            return None
+        end = min(offset + len(data_bytes), self.__input_data_size)
+        self.__input_data[offset:end] = data_bytes[:end - offset]
+        self.__mark_input_changed(offset, end)
+        return offset, end
+
+    # append the values of all history channels that overlap any of the written ranges (offset, end) to their history,
+    # each channel is captured at most once
+    # Note: must be called while holding the input lock.
+    def __capture_history(self, ranges):
+        if not ranges:
+            return
+        timestamp = time.monotonic()
+        for channel in self.__history_channels:
+            channel_end = channel.offset + channel.size
+            if any(channel.offset < end and channel_end > offset for offset, end in ranges):
+                channel.capture(timestamp, self.__input_data)
+
+    # increment the generation counter of all widgets whose input region overlaps [offset, end)
+    # Note: must be called while holding the input lock.
+    def __mark_input_changed(self, offset, end):
+        index = max(bisect.bisect_right(self.__input_region_offsets, offset) - 1, 0)
+        num_regions = len(self.__input_region_offsets)
+        while index < num_regions and self.__input_region_offsets[index] < end:
+            if self.__input_region_ends[index] > offset:
+                self.__input_generations[index] += 1
+            index += 1
+
+    # capture the history of a scalar input field of a widget in a ring buffer with the given capacity (number of samples)
+    # and return the history channel
+    # Note: channels for the same field are shared, the capacity of the first channel is used. Channels are moved to
+    # shared memory with the input data, so that the process that receives the input data captures every write. Channels
+    # that are added afterwards are only captured once per snapshot if the input data is written by another process.
+    def add_history(self, widget, field_name, capacity=65536):
+        codec = widget.inputCodec
+        for field, offset in zip(codec.fields, codec.offsets):
+            if field.name == field_name:
+                break
+        else:
+            raise ValueError("Widget " + widget.__class__.__name__ + " has no input field '" + str(field_name) + "'")
+        if field.count != 1:
+            raise ValueError("The history of input field '" + str(field_name) + "' with more than one value is not supported")
+        offset += widget.offsetInputData
+        from Core.History import HistoryChannel
+        with self.__input_lock:
+            for channel in self.__history_channels:
+                if channel.offset == offset and channel.dtype == field.dtype:
+                    return channel
+            channel = HistoryChannel(offset, field.dtype, capacity)
+            self.__history_channels.append(channel)
+        return channel
+
+    # call a read function without blocking writers and return its result, the read is repeated if a write happened
+    # meanwhile, the writer lock is only taken after MAX_READ_RETRIES failed attempts
+    # Note: index selects the input (0) or output (1) sequence number. Writers of another process cannot be locked out,
+    # so in shared memory None is returned after MAX_READ_RETRIES failed attempts, e.g. if the writer process died
+    # during a write (see recover_interrupted_write()).
+    def __read_consistent(self, read, index=0, lock=None):
+        attempt = 0
+        while attempt < MAX_READ_RETRIES:
+            sequence = self.__sequences[index]
+            if not sequence & 1:
+                result = read()
+                if self.__sequences[index] == sequence:
+                    return result
+            else:
+                time.sleep(0)  # a write is in progress: yield to the writer
+            self.__read_retries += 1
+            attempt += 1
+        if self.__shared_memory is not None:
+            return None
+        with (self.__input_lock if lock is None else lock):
+            return read()
+
+    # make the sequence numbers of the shared memory even again after the writer process died during a write, so that
+    # readers get the data again (the data of the interrupted write may be incomplete)
+    # Note: must only be called once the writer process has exited, e.g. a receiver process.
+    def recover_interrupted_write(self):
+        with self.__input_lock, self.__output_lock:
+            for index in range(2):
+                if self.__sequences[index] & 1:
+                    self.__sequences[index] += 1
 
     # read bytes from input data at given offset
+    # Note: returns None if no consistent state of the shared memory could be read.
     def read_input(self, offset, length):
-        with self.__input_lock:
-            if offset < 0 or offset >= self.__input_data_size:
-                return bytes()
-            end = min(offset + length, self.__input_data_size)
-            return bytes(self.__input_data[offset:end])
+        if self.__unallocated:
+            self.allocate()
+        if offset < 0 or offset >= self.__input_data_size:
+            return bytes()
+        end = min(offset + length, self.__input_data_size)
+        return self.__read_consistent(lambda: bytes(self.__input_data[offset:end]))
+
+    # copy the entire input data and all generation counters as one consistent state and return a read-only view
+    # Note: the snapshot buffers are reused, the view is only valid until the next call of this function. The data is
+    # copied to a spare buffer, so that the previous snapshot is kept if no consistent state of the shared memory could
+    # be read.
+    def snapshot_input(self):
+        if self.__unallocated:
+            self.allocate()
+        if len(self.__input_snapshot) != self.__input_data_size:
+            self.__input_snapshot = bytearray(self.__input_data_size)
+            self.__spare_snapshot = bytearray(self.__input_data_size)
+        generations = self.__read_consistent(self.__copy_input_to_spare)
+        if generations is None:
+            return memoryview(self.__input_snapshot).toreadonly()
+        self.__input_snapshot, self.__spare_snapshot = self.__spare_snapshot, self.__input_snapshot
+
+        # input data is written by another process: capture the history of changed fields that are not in shared memory
+        # once per snapshot
+        if self.__shared_memory is not None and self.__history_channels:
+            self.__capture_snapshot_history(generations)
+        previous_generations = self.__snapshot_generations
+        self.__snapshot_generations = generations
+        if self.__decoding:
+            self.__decode_snapshot(previous_generations)
+        return memoryview(self.__input_snapshot).toreadonly()
+
+    def __copy_input_to_spare(self):
+        self.__spare_snapshot[:] = self.__input_data
+        return list(self.__input_generations)
+
+    def __capture_snapshot_history(self, generations):
+        timestamp = time.monotonic()
+        previous = self.__snapshot_generations
+        for channel in self.__history_channels:
+            if channel.shared:
+                continue
+            index = bisect.bisect_right(self.__input_region_offsets, channel.offset) - 1
+            if 0 <= index < len(previous) and generations[index] != previous[index]:
+                channel.capture(timestamp, self.__input_snapshot)
+
+    # decode each snapshot of the input data as a whole: the input fields of all widgets are viewed with one numpy
+    # structured data type and all clamped fields are range-checked and clamped with a few vectorized operations per
+    # data type, instead of unpacking and clamping field by field
+    # Note: after each snapshot, widget.inputValues is a typed view of the clamped input fields of the widget, which
+    # stays valid until the next snapshot, see DashboardWidget.updateFromDatastore().
+    def enable_decoding(self):
+        self.__decoding = True
+
+    # copy the snapshot to the decoded input data and clamp all values that are out of range
+    # Note: values of input regions whose generation did not change since the previous snapshot are clamped again, but
+    # they are only counted as out of range once.
+    def __decode_snapshot(self, previous_generations):
+        if self.__decoder is None:
+            self.__decoder = self.__build_decoder()
+        np, groups = self.__decoder
+        raw = np.frombuffer(self.__input_snapshot, np.uint8)
+        self.__decoded_input[:] = raw
+        changed_regions = None
+        for positions, regions, numpy_type, minima, maxima in groups:
+            values = raw[positions].view(numpy_type).ravel()
+            out_of_range = (values < minima) | (values > maxima)
+            if out_of_range.any():
+                if changed_regions is None:
+                    generations = self.__snapshot_generations
+                    if len(previous_generations) == len(generations):
+                        changed_regions = np.array(generations, np.uint64) != np.array(previous_generations, np.uint64)
+                    else:
+                        changed_regions = np.ones(len(generations), bool)
+                self.__out_of_range_count += int(np.count_nonzero(out_of_range & changed_regions[regions]))
+                clamped = np.clip(values[out_of_range], minima[out_of_range], maxima[out_of_range]).astype(numpy_type)
+                self.__decoded_input[positions[out_of_range]] = clamped.view(np.uint8).reshape(-1, positions.shape[1])
+
+    # build the structured data type of the entire input data, bind the typed view of each widget and group the byte
+    # positions, input regions and ranges of all clamped values by data type
+    # Note: numpy is only imported once decoding is used. All values of fields with count > 1 are clamped as well.
+    def __build_decoder(self):
+        import numpy as np
+        self.__decoded_input = np.zeros(self.__input_data_size, np.uint8)
+        names, formats, offsets, bound_widgets = [], [], [], []
+        clamps = {}
+        for region, widget in enumerate(self.widgets):
+            codec = widget.inputCodec
+            widget.inputValues = None
+            if not codec.size or widget.offsetInputData + codec.size > self.__input_data_size:
+                continue
+            names.append('widget' + str(len(names)))
+            formats.append(codec.numpyType())
+            offsets.append(widget.offsetInputData)
+            bound_widgets.append(widget)
+            for field, offset in zip(codec.fields, codec.offsets):
+                if field.minimum is None and field.maximum is None:
+                    continue
+                positions, regions, minima, maxima = clamps.setdefault(field.dtype, ([], [], [], []))
+                item_size = struct.calcsize(FIELD_TYPES[field.dtype])
+                for i in range(field.count):
+                    positions.append(widget.offsetInputData + offset + i * item_size)
+                    regions.append(region)
+                    minima.append(-np.inf if field.minimum is None else field.minimum)
+                    maxima.append(np.inf if field.maximum is None else field.maximum)
+        if names:
+            input_type = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': self.__input_data_size})
+            typed_input = self.__decoded_input.view(input_type)
+            for name, widget in zip(names, bound_widgets):
+                widget.inputValues = typed_input[name].reshape(())
+        groups = []
+        for dtype, (positions, regions, minima, maxima) in clamps.items():
+            numpy_type = np.dtype('=' + FIELD_TYPES[dtype])
+            positions = np.array(positions, np.intp)[:, None] + np.arange(numpy_type.itemsize)
+            groups.append((positions, np.array(regions, np.intp), numpy_type, np.array(minima, np.float64), np.array(maxima, np.float64)))
+        return np, groups
+
+    # get all widgets whose input data changed in the latest snapshot together with the snapshot generation
+    # Note: the widget must store the generation (widget.inputGeneration) once it has read its input data.
+    def get_changed_widgets(self):
+        return [(widget, generation) for widget, generation in zip(self.widgets, self.__snapshot_generations) if widget.inputGeneration != generation]
+
+    # get the total time in seconds that was spent waiting for the input lock
+    # Note: only writers and readers that exceeded MAX_READ_RETRIES wait for the input lock.
+    def get_lock_wait_time(self):
+        return self.__input_lock.wait_time
+
+    # get the total number of reads of input data that had to be repeated because of a concurrent write
+    def get_read_retries(self):
+        return self.__read_retries
+
+    # get the total number of decoded input values that were out of range and have been clamped, counted once per change
+    # of their input region
+    def get_out_of_range_count(self):
+        return self.__out_of_range_count
 
     # write bytes to output data at given offset
+    # Note: has no effect if the datastore is attached to shared memory for display only, see attach_shared_memory().
     def write_output(self, offset, data_bytes):
-        if offset < 0 or offset >= self.__output_data_size:
+        if self.__display_only:
             return
-        end = min(offset + len(data_bytes), self.__output_data_size)
-        self.__output_data[offset:end] = data_bytes[:end - offset]
+        if self.__unallocated:
+            self.allocate()
+        with self.__output_lock:
+            if offset < 0 or offset >= self.__output_data_size:
+                return
+            end = min(offset + len(data_bytes), self.__output_data_size)
+            self.__sequences[1] += 1
+            try:
+                self.__output_data[offset:end] = data_bytes[:end - offset]
+            finally:
+                self.__sequences[1] += 1
+
+    # request an immediate send of the output data, e.g. after a user interaction, by setting all registered events
+    # Note: the output data must be written before. Senders register an event to wait for with add_output_request_event()
+    # and limit the rate of immediate sends themselves.
+    def request_output(self):
+        if self.__display_only:
+            return
+        for event in self.__output_request_events:
+            event.set()
+
+    # register or unregister an event that is set by request_output()
+    def add_output_request_event(self, event):
+        if event not in self.__output_request_events:
+            self.__output_request_events.append(event)
+
+    def remove_output_request_event(self, event):
+        if event in self.__output_request_events:
+            self.__output_request_events.remove(event)
 
     # get the entire output data as bytes
+    # Note: returns None if no consistent state of the shared memory could be read.
     def get_output(self):
-        return bytes(self.__output_data)
+        if self.__unallocated:
+            self.allocate()
+        return self.__read_consistent(lambda: bytes(self.__output_data), 1, self.__output_lock)
 
-    # write memory layout of all widgets to json file
-    def write_layout_to_file(self, filename):
-        import json
+    # move input and output data, region table, sequence numbers and history channels to a new shared memory block and
+    # return its name
+    # Note: this must be called after all widgets have been added. Other processes attach with attach_shared_memory().
+    def share_memory(self, name=None):
+        num_regions = len(self.__input_region_offsets)
+        from Core.History import HistoryChannel
+        channels = list(self.__history_channels)
+        history_position = self.__history_position(num_regions, self.__input_data_size, self.__output_data_size)
+        size = history_position + sum(HISTORY_CHANNEL_ENTRY.size + HistoryChannel.bufferSize(channel.capacity) for channel in channels)
+        from multiprocessing import shared_memory
+        layout_hash = self.get_layout_hash()
+        memory = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        with self.__input_lock, self.__output_lock:
+            self.__allocate()
+            SHARED_MEMORY_HEADER.pack_into(memory.buf, 0, SHARED_MEMORY_MAGIC, self.__sequences[0], self.__sequences[1], num_regions, self.__input_data_size, self.__output_data_size, layout_hash, len(channels))
+            position = SHARED_MEMORY_HEADER.size
+            struct.pack_into('=' + str(num_regions) + 'I', memory.buf, position, *self.__input_region_offsets)
+            struct.pack_into('=' + str(num_regions) + 'I', memory.buf, position + 4 * num_regions, *self.__input_region_ends)
+            struct.pack_into('=' + str(num_regions) + 'Q', memory.buf, position + 8 * num_regions, *self.__input_generations)
+            position += 16 * num_regions
+            memory.buf[position:position + self.__input_data_size] = self.__input_data
+            position += self.__input_data_size
+            memory.buf[position:position + self.__output_data_size] = self.__output_data
+
+            # the history channels keep their samples and are filled by the process that writes the input data
+            position = history_position
+            for channel in channels:
+                HISTORY_CHANNEL_ENTRY.pack_into(memory.buf, position, channel.offset, channel.capacity, channel.dtype.encode())
+                position += HISTORY_CHANNEL_ENTRY.size
+            for channel in channels:
+                end = position + HistoryChannel.bufferSize(channel.capacity)
+                memory.buf[position:end] = channel.buffer
+                channel.bind(memory.buf[position:end], shared=True)
+                position = end
+            self.__bind_shared_memory(memory)
+        return memory.name
+
+    # get the position of the history channels in shared memory, aligned to 8 bytes for the float64 buffers
+    @staticmethod
+    def __history_position(num_regions, input_size, output_size):
+        position = SHARED_MEMORY_HEADER.size + num_regions * 16 + input_size + output_size
+        return (position + 7) & ~7
+
+    # attach to the shared memory block of another process, e.g. to receive input data in a separate process
+    # Note: if widgets have been added, their memory layout must be equal to the layout of the shared memory. Child
+    # processes share the resource tracker of the creating process and must set track to True.
+    # History channels of the same fields use the channels in shared memory, e.g. the channels of strip charts of an
+    # attached dashboard are filled by the receiver process.
+    # If display_only is True, this process only reads the shared memory: output data is owned by the process that
+    # created it, write_output() and request_output() have no effect until the shared memory is closed.
+    def attach_shared_memory(self, name, track=False, display_only=False):
+        from multiprocessing import resource_tracker, shared_memory
+        memory = shared_memory.SharedMemory(name=name)
+
+        # the creating process owns the shared memory, it must not be removed when this process exits
+        if not track:
+            resource_tracker.unregister(memory._name, 'shared_memory')
+        magic, _, _, num_regions, input_size, output_size, layout_hash, num_channels = SHARED_MEMORY_HEADER.unpack_from(memory.buf)
+        if magic != SHARED_MEMORY_MAGIC:
+            memory.close()
+            raise ValueError("'" + str(name) + "' is not a shared memory of a datastore")
+        position = SHARED_MEMORY_HEADER.size
+        offsets = list(struct.unpack_from('=' + str(num_regions) + 'I', memory.buf, position))
+        ends = list(struct.unpack_from('=' + str(num_regions) + 'I', memory.buf, position + 4 * num_regions))
+        if self.widgets and layout_hash != self.get_layout_hash():
+            memory.close()
+            raise ValueError("The memory layout of shared memory '" + str(name) + "' does not match the memory layout of the dashboard")
+        with self.__input_lock, self.__output_lock:
+            self.__input_region_offsets = offsets
+            self.__input_region_ends = ends
+            self.__input_data_size = input_size
+            self.__output_data_size = output_size
+            self.__layout_hash = layout_hash
+            self.__unallocated = False
+            self.__decoder = None
+            self.__display_only = bool(display_only)
+            self.__bind_shared_memory(memory)
+            self.__bind_shared_history(memory, self.__history_position(num_regions, input_size, output_size), num_channels)
+
+    # bind all history channels in shared memory to the channel of the same field, channels that do not exist in this
+    # process are added (e.g. in a receiver process)
+    # Note: must be called while holding the input lock.
+    def __bind_shared_history(self, memory, position, num_channels):
+        from Core.History import HistoryChannel
+        entries = []
+        for _ in range(num_channels):
+            offset, capacity, dtype = HISTORY_CHANNEL_ENTRY.unpack_from(memory.buf, position)
+            entries.append((offset, capacity, dtype.rstrip(b'\x00').decode()))
+            position += HISTORY_CHANNEL_ENTRY.size
+        for offset, capacity, dtype in entries:
+            end = position + HistoryChannel.bufferSize(capacity)
+            buffer = memory.buf[position:end]
+            position = end
+            for channel in self.__history_channels:
+                if channel.offset == offset and channel.dtype == dtype and not channel.shared:
+                    if channel.capacity == capacity:
+                        channel.bind(buffer, shared=True)
+                    else:
+                        # a channel of another capacity cannot use the buffer: keep it local and capture per snapshot
+                        buffer.release()
+                    break
+            else:
+                self.__history_channels.append(HistoryChannel(offset, dtype, capacity, buffer, shared=True))
+
+    # replace the local buffers by views of the shared memory
+    # Note: must be called while holding the input and output lock.
+    def __bind_shared_memory(self, memory):
+        num_regions = len(self.__input_region_offsets)
+        position = SHARED_MEMORY_HEADER.size + 8 * num_regions
+        self.__sequences = memory.buf[8:24].cast('Q')
+        self.__input_generations = memory.buf[position:position + 8 * num_regions].cast('Q')
+        position += 8 * num_regions
+        self.__input_data = memory.buf[position:position + self.__input_data_size]
+        position += self.__input_data_size
+        self.__output_data = memory.buf[position:position + self.__output_data_size]
+        self.__shared_memory = memory
+
+    # copy all data back to local buffers and release the shared memory, it is removed if unlink is True (only the
+    # creating process should remove it)
+    def close_shared_memory(self, unlink=False):
+        memory = self.__shared_memory
+        if memory is None:
+            return
+        with self.__input_lock, self.__output_lock:
+            views = (self.__sequences, self.__input_generations, self.__input_data, self.__output_data)
+            self.__sequences = memoryview(bytearray(self.__sequences)).cast('Q')
+            self.__input_generations = list(self.__input_generations)
+            self.__input_data = bytearray(self.__input_data)
+            self.__output_data = bytearray(self.__output_data)
+            self.__shared_memory = None
+            self.__display_only = False
+            for view in views:
+                view.release()
+
+            # history channels keep a local copy of their samples
+            for channel in self.__history_channels:
+                if channel.shared:
+                    channel.bind(bytearray(channel.buffer)).release()
+        memory.close()
+        if unlink:
+            memory.unlink()
+
+    # get the memory layout of all widgets as list of dictionaries
+    def get_layout(self):
         layout = []
         for widget in self.widgets:
             data_size = widget.requiredIODatastoreSize()
@@ -70,10 +575,44 @@ class Datastore:
                 'input_offset': widget.offsetInputData,
                 'input_size': input_size,
                 'output_offset': widget.offsetOutputData,
-                'output_size': output_size
+                'output_size': output_size,
+                'input_fields': widget.inputCodec.layout(widget.offsetInputData),
+                'output_fields': widget.outputCodec.layout(widget.offsetOutputData)
             })
-        with open(filename, 'w') as f:
-            json.dump(layout, f, indent=4)
+        return layout
+
+    # get the memory layout as json text (the content of the memory layout file)
+    def __get_layout_text(self):
+        if self.__layout_text is None:
+            self.__layout_text = json.dumps(self.get_layout(), indent=4)
+        return self.__layout_text
+
+    # get the hash of the memory layout: the first 4 bytes of the SHA-256 digest of the memory layout file as uint32
+    # (little-endian), which allows senders to verify the layout they were built for
+    def get_layout_hash(self):
+        if self.__layout_hash is None:
+            digest = hashlib.sha256(self.__get_layout_text().encode()).digest()
+            self.__layout_hash = int.from_bytes(digest[:4], 'little')
+        return self.__layout_hash
+
+    # get the total size of input and output data in bytes
+    def get_data_sizes(self):
+        return self.__input_data_size, self.__output_data_size
+
+    # write memory layout of all widgets to json file, the file is only written if its content changed
+    # Note: returns True if the file has been written.
+    def write_layout_to_file(self, filename):
+        text = self.__get_layout_text().encode()
+        try:
+            if os.path.getsize(filename) == len(text):
+                with open(filename, 'rb') as f:
+                    if f.read() == text:
+                        return False
+        except OSError:
+            pass
+        with open(filename, 'wb') as f:
+            f.write(text)
+        return True
 
 # global datastore instance
 datastore = Datastore()
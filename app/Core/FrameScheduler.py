@@ -0,0 +1,63 @@
+import time
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from Core.Metrics import metrics
+
+
+# maximum number of render frames that are dropped after one overrun
+MAX_DROPPED_FRAMES = 10
+
+
+# Scheduler with independent cadences for rendering and network output.
+# The output tick runs at a fixed rate. The render tick drops frames if a frame overran its budget (one render period),
+# e.g. because widgets took long to paint, so that rendering load does not delay the output ticks.
+class FrameScheduler(QObject):
+    renderTick = pyqtSignal()
+    outputTick = pyqtSignal()
+
+    def __init__(self, render_rate=60.0, output_rate=60.0, parent=None):
+        super().__init__(parent)
+        self.renderPeriod = 1.0 / float(render_rate)
+        self.outputPeriod = 1.0 / float(output_rate)
+        self.renderOverruns = 0
+        self.droppedFrames = 0
+        self.outputOverruns = 0
+        self.__framesToDrop = 0
+        self.__lastRenderTimeout = None
+        self.__renderTimer = QTimer(self)
+        self.__renderTimer.setTimerType(Qt.PreciseTimer)
+        self.__renderTimer.timeout.connect(self.__onRenderTimeout)
+        self.__outputTimer = QTimer(self)
+        self.__outputTimer.setTimerType(Qt.PreciseTimer)
+        self.__outputTimer.timeout.connect(self.__onOutputTimeout)
+
+    def start(self):
+        self.__renderTimer.start(max(1, round(self.renderPeriod * 1000)))
+        self.__outputTimer.start(max(1, round(self.outputPeriod * 1000)))
+
+    def stop(self):
+        self.__renderTimer.stop()
+        self.__outputTimer.stop()
+
+    def __onRenderTimeout(self):
+        # the delay of this timeout is the time the event loop was busy, e.g. painting the previous frame
+        now = time.perf_counter()
+        delay = 0.0 if self.__lastRenderTimeout is None else max(0.0, now - self.__lastRenderTimeout - self.renderPeriod)
+        self.__lastRenderTimeout = now
+        if self.__framesToDrop > 0:
+            self.__framesToDrop -= 1
+            self.droppedFrames += 1
+            metrics.countEvent('dropped_frames')
+            return
+        self.renderTick.emit()
+        frame_time = time.perf_counter() - now + delay
+        if frame_time > self.renderPeriod:
+            self.renderOverruns += 1
+            metrics.countEvent('render_overruns')
+            self.__framesToDrop = min(int(frame_time / self.renderPeriod), MAX_DROPPED_FRAMES)
+
+    def __onOutputTimeout(self):
+        t0 = time.perf_counter()
+        self.outputTick.emit()
+        if time.perf_counter() - t0 > self.outputPeriod:
+            self.outputOverruns += 1
+            metrics.countEvent('output_overruns')
@@ -0,0 +1,69 @@
+import struct
+import numpy as np
+from Core.DataField import FIELD_TYPES
+
+
+# Preallocated ring buffer with the history of one scalar input field, filled directly from the receive path.
+# The number of samples (uint64), the timestamps and the values (float64 each) are stored in one buffer, which can be
+# moved to shared memory, so that the history is filled by a receiver process and read by the GUI process, see bind().
+# Note: there is a single writer that stores a sample before it increments the number of samples. Readers do not block
+# the writer but drop the samples that may have been overwritten while they were copied.
+class HistoryChannel:
+    def __init__(self, offset, dtype, capacity, buffer=None, shared=False):
+        self.offset = int(offset)
+        self.dtype = dtype
+        self.capacity = int(capacity)
+        self.__struct = struct.Struct('=' + FIELD_TYPES[dtype])
+        self.size = self.__struct.size
+        self.shared = False
+        self.buffer = None
+        self.bind(bytearray(self.bufferSize(self.capacity)) if buffer is None else buffer, shared)
+
+    # get the size in bytes of the buffer of a channel with the given capacity
+    @staticmethod
+    def bufferSize(capacity):
+        return 8 + 16 * int(capacity)
+
+    # store the history in the given buffer of bufferSize(capacity) bytes, which keeps its content, and return the previous
+    # buffer. shared marks a buffer in shared memory that is filled by the process that writes the input data.
+    # Note: the buffer must be aligned to 8 bytes.
+    def bind(self, buffer, shared=False):
+        previous = self.buffer
+        self.buffer = buffer
+        self.shared = bool(shared)
+        self.__count = np.frombuffer(buffer, dtype=np.uint64, count=1)
+        self.__times = np.frombuffer(buffer, dtype=np.float64, count=self.capacity, offset=8)
+        self.__values = np.frombuffer(buffer, dtype=np.float64, count=self.capacity, offset=8 + 8 * self.capacity)
+        return previous
+
+    @property
+    def numSamples(self):
+        return int(self.__count[0])
+
+    # decode the field from the input data and append it with a timestamp (time.monotonic() in seconds)
+    def capture(self, timestamp, input_data):
+        value, = self.__struct.unpack_from(input_data, self.offset)
+        count = int(self.__count[0])
+        i = count % self.capacity
+        self.__times[i] = timestamp
+        self.__values[i] = value
+        self.__count[0] = count + 1
+
+    # get copies of all samples (times, values) that are not older than start_time, ordered by time
+    def get(self, start_time=None):
+        count = int(self.__count[0])
+        first = max(0, count - self.capacity)
+        indices = np.arange(first, count) % self.capacity
+        times = self.__times[indices]
+        values = self.__values[indices]
+
+        # samples that the writer may have overwritten meanwhile are dropped (the oldest ones)
+        overwritten = int(self.__count[0]) + 1 - self.capacity - first
+        if overwritten > 0:
+            times = times[overwritten:]
+            values = values[overwritten:]
+        if start_time is not None:
+            first = np.searchsorted(times, start_time)
+            times = times[first:]
+            values = values[first:]
+        return times, values
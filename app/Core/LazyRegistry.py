@@ -0,0 +1,44 @@
+import importlib
+import sys
+import time
+import types
+
+
+# Make a package a registry of classes whose modules are imported on first use of a class, e.g. "from Core import
+# NetworkManager" (PEP 562). modules maps each class name to the name of its module in the package, on_import is an
+# optional function that is called with each class once its module has been imported.
+# Note: the import durations are recorded by the startup profiler.
+def makeLazyRegistry(package_name, modules, on_import=None):
+    package = sys.modules[package_name]
+    package.__all__ = list(modules)
+    package._lazyModules = modules
+
+    # import the module of a class on first access
+    def __getattr__(name):
+        if name not in modules:
+            raise AttributeError("module '" + package_name + "' has no attribute '" + name + "'")
+        t0 = time.perf_counter()
+        module = importlib.import_module('.' + modules[name], package_name)
+        from Core.StartupProfiler import startupProfiler
+        startupProfiler.recordImport(package_name + '.' + modules[name], time.perf_counter() - t0)
+        value = getattr(module, name)
+        if on_import is not None:
+            on_import(value)
+        setattr(package, name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(package)) | set(package.__all__))
+
+    package.__getattr__ = __getattr__
+    package.__dir__ = __dir__
+    package.__class__ = _LazyRegistry
+
+
+# Importing a submodule sets the submodule as attribute of its package. For registered names, the attribute is set to
+# the class of the same name instead, so that e.g. "from Core import DashboardWidget" always returns the class.
+class _LazyRegistry(types.ModuleType):
+    def __setattr__(self, name, value):
+        if name in self._lazyModules and isinstance(value, types.ModuleType):
+            value = getattr(value, name, value)
+        super().__setattr__(name, value)
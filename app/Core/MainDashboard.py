@@ -1,9 +1,36 @@
-from PyQt5.QtWidgets import *
-from PyQt5.QtCore import *
-from DashboardWidgets import *
+from PyQt5.QtWidgets import QWidget, QTabWidget, QScrollArea, QVBoxLayout
+from PyQt5.QtCore import pyqtSignal
 
 
 class MainDashboard(QWidget):
+    # emitted when other widgets became visible, e.g. because another page has been selected or a page was scrolled
+    visibleWidgetsChanged = pyqtSignal()
+
     def __init__(self, parent=None):
         super().__init__(parent=parent)
         self.setObjectName("dashboard")
+        self.__tabs = None
+
+    # add a page with a title to a tabbed dashboard and return the page widget, the caller sets the layout of the page
+    # Note: the first page replaces the layout of the dashboard by a tab widget. If scrollable is True, the page is
+    # placed in a scroll area, e.g. for pages with many widgets.
+    def addPage(self, title, scrollable=False):
+        if self.__tabs is None:
+            layout = QVBoxLayout(self)
+            layout.setSpacing(0)
+            layout.setContentsMargins(0, 0, 0, 0)
+            self.__tabs = QTabWidget(self)
+            self.__tabs.setObjectName("dashboardPages")
+            self.__tabs.currentChanged.connect(self.visibleWidgetsChanged)
+            layout.addWidget(self.__tabs)
+        page = QWidget()
+        if scrollable:
+            scrollArea = QScrollArea()
+            scrollArea.setWidgetResizable(True)
+            scrollArea.setWidget(page)
+            scrollArea.verticalScrollBar().valueChanged.connect(self.visibleWidgetsChanged)
+            scrollArea.horizontalScrollBar().valueChanged.connect(self.visibleWidgetsChanged)
+            self.__tabs.addTab(scrollArea, title)
+        else:
+            self.__tabs.addTab(page, title)
+        return page
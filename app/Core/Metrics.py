@@ -0,0 +1,190 @@
+import json
+import socket
+import time
+
+
+# Running statistics (count, mean, maximum) of durations in seconds over one reporting period.
+class DurationStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.maximum:
+            self.maximum = duration
+
+    # get the statistics in milliseconds and reset them
+    def collect(self):
+        report = {
+            'count': self.count,
+            'mean_ms': (self.total / self.count * 1000.0) if self.count else 0.0,
+            'max_ms': self.maximum * 1000.0
+        }
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        return report
+
+
+# Global runtime metrics: tick jitter, per-widget decode and paint durations, receive rates and datastore lock wait time.
+# Durations are only recorded while the metrics are enabled, counters of the network manager and datastore are always on.
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.period = 1.0
+        self.lastReport = {}
+        self.__tickJitter = DurationStats()
+        self.__lastTickTime = None
+        self.__unpackDurations = {}
+        self.__paintDurations = {}
+        self.__exportTarget = None
+        self.__exportSocket = None
+        self.__lastCollectTime = time.monotonic()
+        self.__lastReceived = {}
+        self.__lastLockWaitTime = 0.0
+        self.__lastReadRetries = 0
+        self.__lastOutOfRangeCount = 0
+        self.__events = {}
+
+    # enable metrics and instrument all widgets, an optional export target is either 'file:<filename>' to append one
+    # json line per period or 'udp:<host>:<port>' to send one json datagram per period
+    def enable(self, period=1.0, export_target=None):
+        from Core.Datastore import datastore
+        self.enabled = True
+        self.period = float(period)
+        self.__exportTarget = export_target
+        if export_target and export_target.startswith('udp:'):
+            self.__exportSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        for widget in datastore.widgets:
+            self.instrumentWidget(widget)
+
+    # record the duration of the paint event of a widget
+    # Note: the paint event is overridden by an instance attribute, like for other event handlers of widgets.
+    def instrumentWidget(self, widget):
+        if not self.enabled or getattr(widget, '_metricsInstrumented', False):
+            return
+        widget._metricsInstrumented = True
+        paint_event = widget.paintEvent
+        durations = self.__stats(self.__paintDurations, widget)
+        def timedPaintEvent(event):
+            t0 = time.perf_counter()
+            paint_event(event)
+            durations.add(time.perf_counter() - t0)
+        widget.paintEvent = timedPaintEvent
+
+    # record the time of a tick, the jitter is the deviation from the expected interval in seconds
+    def recordTick(self, expected_interval):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.__lastTickTime is not None:
+            self.__tickJitter.add(abs(now - self.__lastTickTime - expected_interval))
+        self.__lastTickTime = now
+
+    # count an event, e.g. a frame overrun, the counts are reported per period
+    def countEvent(self, name):
+        self.__events[name] = self.__events.get(name, 0) + 1
+
+    # record the duration of unpacking the input data of a widget
+    def recordUnpack(self, widget, duration):
+        self.__stats(self.__unpackDurations, widget).add(duration)
+
+    def __stats(self, stats, widget):
+        if widget not in stats:
+            stats[widget] = DurationStats()
+        return stats[widget]
+
+    # get the name of a widget for reports: the object name if set, otherwise the class name and the index of the widget
+    def __names(self, stats):
+        from Core.Datastore import datastore
+        indices = {widget: i for i, widget in enumerate(datastore.widgets)}
+        return {widget: widget.objectName() or (widget.__class__.__name__ + '#' + str(indices.get(widget, -1))) for widget in stats}
+
+    # collect all metrics of the last period, store them as lastReport and export them
+    # Note: network_managers is a list of network managers (threads or receiver processes) whose receive and send
+    # counters are reported, send overruns and errors are counted as events.
+    def collect(self, network_managers=()):
+        from Core.Datastore import datastore
+        now = time.monotonic()
+        elapsed = max(now - self.__lastCollectTime, 1e-9)
+        self.__lastCollectTime = now
+        received = {}
+        for i, network_manager in enumerate(network_managers):
+            counters = (network_manager.receivedDatagrams, network_manager.receivedBytes,
+                        network_manager.sendOverruns, network_manager.sendErrors)
+            datagrams, num_bytes, send_overruns, send_errors = (
+                counter - last for counter, last in zip(counters, self.__lastReceived.get(i, (0, 0, 0, 0))))
+            self.__lastReceived[i] = counters
+            received['datagrams_per_s'] = received.get('datagrams_per_s', 0.0) + datagrams / elapsed
+            received['bytes_per_s'] = received.get('bytes_per_s', 0.0) + num_bytes / elapsed
+            for name, count in (('send_overruns', send_overruns), ('send_errors', send_errors)):
+                if count:
+                    self.__events[name] = self.__events.get(name, 0) + count
+        lock_wait_time = datastore.get_lock_wait_time()
+        read_retries = datastore.get_read_retries()
+        out_of_range_count = datastore.get_out_of_range_count()
+        report = {
+            'time': time.time(),
+            'tick_jitter': self.__tickJitter.collect(),
+            'receive': received,
+            'datastore_lock_wait_ms_per_s': (lock_wait_time - self.__lastLockWaitTime) / elapsed * 1000.0,
+            'datastore_read_retries_per_s': (read_retries - self.__lastReadRetries) / elapsed,
+            'datastore_out_of_range_per_s': (out_of_range_count - self.__lastOutOfRangeCount) / elapsed,
+            'events': self.__events,
+            'unpack': self.__collectDurations(self.__unpackDurations),
+            'paint': self.__collectDurations(self.__paintDurations)
+        }
+        self.__lastLockWaitTime = lock_wait_time
+        self.__lastReadRetries = read_retries
+        self.__lastOutOfRangeCount = out_of_range_count
+        self.__events = {}
+        self.lastReport = report
+        self.__export(report)
+        return report
+
+    def __collectDurations(self, stats):
+        names = self.__names(stats)
+        return {names[widget]: durations.collect() for widget, durations in stats.items()}
+
+    def __export(self, report):
+        if not self.__exportTarget:
+            return
+        try:
+            message = json.dumps(report)
+            if self.__exportTarget.startswith('file:'):
+                with open(self.__exportTarget[5:], 'a') as f:
+                    f.write(message + '\n')
+            elif self.__exportTarget.startswith('udp:'):
+                host, port = self.__exportTarget[4:].rsplit(':', 1)
+                self.__exportSocket.sendto(message.encode(), (host, int(port)))
+        except Exception:
+            pass
+
+    # get the last report as human-readable text
+    def formatReport(self):
+        report = self.lastReport
+        if not report:
+            return "no metrics collected yet"
+        lines = []
+        jitter = report['tick_jitter']
+        lines.append("tick jitter: mean %.2f ms, max %.2f ms" % (jitter['mean_ms'], jitter['max_ms']))
+        receive = report['receive']
+        if receive:
+            lines.append("receive: %.0f datagrams/s, %.1f kB/s" % (receive['datagrams_per_s'], receive['bytes_per_s'] / 1000.0))
+        lines.append("datastore lock wait: %.3f ms/s, read retries: %.1f/s" % (report['datastore_lock_wait_ms_per_s'], report['datastore_read_retries_per_s']))
+        lines.append("clamped input values: %.1f/s" % report['datastore_out_of_range_per_s'])
+        for name, count in sorted(report['events'].items()):
+            lines.append("%s: %d" % (name.replace('_', ' '), count))
+        for kind in ('unpack', 'paint'):
+            slowest = sorted(report[kind].items(), key=lambda item: item[1]['max_ms'], reverse=True)[:5]
+            for name, stats in slowest:
+                if stats['count']:
+                    lines.append("%s %s: %d x, mean %.3f ms, max %.3f ms" % (kind, name, stats['count'], stats['mean_ms'], stats['max_ms']))
+        return '\n'.join(lines)
+
+
+# global metrics instance
+metrics = Metrics()
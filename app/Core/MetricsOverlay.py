@@ -0,0 +1,27 @@
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import Qt
+from Core.Metrics import metrics
+
+
+# Overlay that shows the last metrics report on top of its parent widget.
+class MetricsOverlay(QLabel):
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self.setObjectName("metricsOverlay")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        self.hide()
+
+    # show or hide the overlay
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+        if self.isVisible():
+            self.refresh()
+            self.raise_()
+
+    # update the text from the last metrics report
+    def refresh(self):
+        if not self.isVisible():
+            return
+        self.setText(metrics.formatReport())
+        self.adjustSize()
@@ -1,65 +1,504 @@
-import numpy as np
+import selectors
 import socket
 import struct
+import sys
 import threading
-from Core import *
+import time
+from collections import namedtuple
+from Core.DatagramLog import DatagramRecorder
 from Core.Datastore import datastore
 
 
+# maximum size of a UDP datagram
+MAX_DATAGRAM_SIZE = 65507
+
+# header of an offset-addressed message: offset address (uint32) in the input or output data of the datastore
+OFFSET_HEADER = struct.Struct('=I')
+
+# reserved offset address that marks a fragment of a frame, followed by the remaining frame header
+FRAME_MARKER = 0xFFFFFFFE
+
+# header of a frame fragment: marker (uint32), frame id (uint32), fragment index (uint16), number of fragments (uint16),
+# offset address (uint32)
+FRAME_HEADER = struct.Struct('=IIHHI')
+
+# maximum number of fragments of a frame (the number of fragments is a uint16)
+MAX_FRAME_FRAGMENTS = 0xFFFF
+
+# reserved offset address that marks a datagram with several segments, followed by the number of segments (uint16)
+SEGMENTS_MARKER = 0xFFFFFFFF
+SEGMENTS_HEADER = struct.Struct('=IH')
+
+# header of each segment of a multi-segment datagram: offset address (uint32), number of data bytes (uint16)
+SEGMENT_HEADER = struct.Struct('=IH')
+
+# reserved offset address that marks a layout announcement, followed by the layout hash, the input data size and the
+# output data size (uint32)
+LAYOUT_MARKER = 0xFFFFFFFD
+LAYOUT_MESSAGE = struct.Struct('=IIII')
+
+# maximum number of incomplete frames per source that are kept while waiting for missing fragments
+MAX_PENDING_FRAMES = 16
+
+# maximum number of sources of frames whose frame state (last applied frame and incomplete frames) is kept
+MAX_FRAME_SOURCES = 256
+
+# a frame id that is at most this number of frames behind the last applied frame of its source is a late frame and is
+# dropped, a frame id further behind is taken as a restart of the source
+FRAME_REORDER_WINDOW = 1024
+
+# the sender thread sleeps until this time (in seconds) before a send deadline and then yields until the deadline
+SEND_SPIN_TIME = 0.0005
+
+# a send of the output data that blocks longer than this time (in seconds) because the send buffer is full is dropped
+SEND_TIMEOUT = 1.0
+
+# changed output regions that are separated by at most this number of unchanged bytes are sent as one message
+DELTA_MERGE_GAP = 32
+
+# socket option to only receive multicast datagrams of joined groups (not defined by the socket module on all versions)
+IP_MULTICAST_ALL = getattr(socket, 'IP_MULTICAST_ALL', 49 if sys.platform.startswith('linux') else None)
+
+# Network endpoint: datagrams received on local_port from the multicast group are written to the input data region
+# starting at input_offset with input_size bytes (None: until the end), offset addresses of received datagrams are
+# relative to input_offset and data beyond the region is dropped. The output data region starting at output_offset with
+# output_size bytes (None: until the end) is sent to dest_port, offset addresses of sent messages are relative to
+# output_offset.
+Endpoint = namedtuple('Endpoint', ['group', 'local_port', 'dest_port', 'input_offset', 'output_offset', 'output_size', 'input_size'], defaults=(0, 0, None, None))
+
+
 # Thread to manage network communication (receiving and sending).
 class NetworkManager(threading.Thread):
-    def __init__(self, group='239.192.168.11', local_port=11077, dest_port=11088):
+    # Note: output_mode is either 'full' (send the entire output data each time) or 'delta' (only send changed regions
+    # as offset-addressed messages and the entire output data every keepalive_period seconds).
+    # If max_message_size is given, output data is split into offset-addressed fragments of at most that size. If
+    # frame_id is True, all fragments of one output are sent as frame fragments with a common frame id.
+    # If send_rate (in Hz) is given, output data is sent by a dedicated sender thread on a drift-free schedule instead of
+    # calling sendOutputData() from the GUI thread.
+    # If a list of endpoints is given, all endpoints are served by this thread instead of the single endpoint given by
+    # group, local_port and dest_port.
+    # If announce_layout is True, a layout announcement with the hash of the memory layout is sent every
+    # keepalive_period seconds, so that senders can verify that they match the memory layout.
+    # The sender thread also sends output data immediately when it is requested by datastore.request_output(), but at
+    # most once per min_request_interval seconds. An event of another process that is set on such requests can be given
+    # as output_request, e.g. a multiprocessing.Event.
+    # If receive is False, no receive sockets are opened and the thread only sends output data, e.g. during a replay.
+    def __init__(self, group='239.192.168.11', local_port=11077, dest_port=11088, batch_size=64, output_mode='full', keepalive_period=1.0, max_message_size=None, frame_id=False, send_rate=None, endpoints=None, announce_layout=False, min_request_interval=0.005, output_request=None, receive=True):
         super().__init__(daemon=True)
-        self.group = group
-        self.local_port = int(local_port)
-        self.dest_port = int(dest_port)
+        if output_mode not in ('full', 'delta'):
+            raise ValueError("Unknown output mode '" + str(output_mode) + "'")
+        self.endpoints = [Endpoint(group, int(local_port), int(dest_port))] if endpoints is None else [Endpoint(*endpoint) for endpoint in endpoints]
+        if not self.endpoints:
+            raise ValueError("At least one endpoint is required")
+        self.group = self.endpoints[0].group
+        self.local_port = self.endpoints[0].local_port
+        self.dest_port = self.endpoints[0].dest_port
+        self.batch_size = int(batch_size)
+        self.output_mode = output_mode
+        self.keepalive_period = float(keepalive_period)
+        self.max_message_size = MAX_DATAGRAM_SIZE if max_message_size is None else min(int(max_message_size), MAX_DATAGRAM_SIZE)
+        self.fragment_output = max_message_size is not None
+        self.frame_id = bool(frame_id)
+        if self.max_message_size <= FRAME_HEADER.size:
+            raise ValueError("The maximum message size must be greater than " + str(FRAME_HEADER.size) + " bytes")
+        if self.frame_id:
+            self.__checkFrameSize()
+        self.send_period = None if send_rate is None else 1.0 / float(send_rate)
+        self.__frameCounter = 0
+        self.__pendingFrames = {}
+        self.__lastFrames = {}
+        self.announce_layout = bool(announce_layout)
+        self.__lastAnnouncement = 0.0
+        self.__lastOutputs = [None] * len(self.endpoints)
+        self.__lastKeepalives = [0.0] * len(self.endpoints)
+        self.__sender = None
+        self.__sendEvent = threading.Event() if output_request is None else output_request
+        self.min_request_interval = float(min_request_interval)
+        self.__lastSendTime = float('-inf')
+        self.receive = bool(receive)
+        self.__recorder = None
+
+        # receive and send statistics
+        self.receivedDatagrams = 0
+        self.receivedBytes = 0
+        self.sendOverruns = 0
+        self.sendErrors = 0
         self._running = threading.Event()
         self._running.set()
         self._sock = None
+        self._socks = []
+        self.__sendSock = None
 
     # Thread entry point: receive multicast data and write to global storage.
     # Note: This thread is started when the start() method is called.
     def run(self):
+        # one socket per endpoint, all sockets are served by one selector
+        selector = selectors.DefaultSelector()
         try:
-            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
-            try:
-                self._sock.bind(('', self.local_port))
-            except OSError:
-                self._sock.bind((self.group, self.local_port))
-            mreq = struct.pack('4sl', socket.inet_aton(self.group), socket.INADDR_ANY)
-            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+            if self.receive:
+                for index, endpoint in enumerate(self.endpoints):
+                    sock = self.__openSocket(endpoint)
+                    self._socks.append(sock)
+                    selector.register(sock, selectors.EVENT_READ, index)
+                self._sock = self._socks[0]
+            self.__sendSock = self.__openSendSocket()
         except Exception:
+            selector.close()
+            self.__closeSockets()
             return
 
+        # start the sender thread once the socket is ready
+        if self.send_period is not None:
+            datastore.add_output_request_event(self.__sendEvent)
+            self.__sender = threading.Thread(target=self.__sendLoop, daemon=True)
+            self.__sender.start()
+
+        # without receive sockets, only the sender thread runs until the thread is stopped
+        if not self.receive:
+            while self._running.is_set():
+                time.sleep(0.1)
+            selector.close()
+            self.__closeSockets()
+            return
+
+        # preallocated receive buffers, one for each datagram of a batch
+        buffers = [memoryview(bytearray(MAX_DATAGRAM_SIZE)) for _ in range(max(1, self.batch_size))]
+
+        # wait until datagrams are pending, then drain them in batches
+        # Note: if a batch was full, more datagrams may be pending and the selector is polled without waiting.
+        batch_full = False
         while self._running.is_set():
             try:
-                data, addr = self._sock.recvfrom(65507)
+                events = selector.select(timeout=0 if batch_full else 0.1)
+            except (OSError, ValueError):
+                break
+            batch_full = False
+            try:
+                for key, _ in events:
+                    segments, ends, full = self.__receiveBatch(key.fileobj, key.data, buffers)
+                    batch_full = batch_full or full
+                    if segments:
+                        datastore.write_input_batch(segments, ends)
             except OSError:
                 break
-            if len(data) < 4:
-                continue
-            input_data_index = np.frombuffer(data[0:4], dtype=np.uint32)[0]
-            datastore.write_input(input_data_index, data[4:])
+        selector.close()
+        self.__closeSockets()
+
+    # create a non-blocking socket that is bound to the local port and joined to the multicast group of an endpoint
+    def __openSocket(self, endpoint):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         try:
-            self._sock.close()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+
+            # several endpoints may use the same port: only receive datagrams of the own group
+            if IP_MULTICAST_ALL is not None and len(self.endpoints) > 1:
+                try:
+                    sock.setsockopt(socket.IPPROTO_IP, IP_MULTICAST_ALL, 0)
+                except OSError:
+                    pass
+            try:
+                sock.bind(('', endpoint.local_port))
+            except OSError:
+                sock.bind((endpoint.group, endpoint.local_port))
+            mreq = struct.pack('4sl', socket.inet_aton(endpoint.group), socket.INADDR_ANY)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+            sock.setblocking(False)
         except Exception:
-            pass
+            sock.close()
+            raise
+        return sock
+
+    # create a blocking socket for sending, so that all messages of an output wait for space in the send buffer instead of
+    # failing like on the non-blocking receive sockets
+    def __openSendSocket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        try:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            sock.settimeout(SEND_TIMEOUT)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def __closeSockets(self):
+        for sock in self._socks + [self.__sendSock]:
+            if sock is None:
+                continue
+            try:
+                sock.close()
+            except Exception:
+                pass
+
+    # receive all pending datagrams of the socket of an endpoint (at most one per buffer) and return the (offset, bytes)
+    # segments, the number of segments after each datagram and whether all buffers have been used, e.g. more datagrams
+    # may be pending
+    def __receiveBatch(self, sock, index, buffers):
+        segments = []
+        ends = []
+        for buffer in buffers:
+            try:
+                num_bytes, source = sock.recvfrom_into(buffer)
+            except BlockingIOError:
+                break
+            self.receivedDatagrams += 1
+            self.receivedBytes += num_bytes
+            recorder = self.__recorder
+            if recorder is not None:
+                recorder.record(buffer[:num_bytes], index)
+            self.parseEndpointDatagram(index, buffer[:num_bytes], source, segments)
+            ends.append(len(segments))
+        else:
+            return segments, ends, True
+        return segments, ends, False
+
+    # parse a datagram that was received by the endpoint with the given index and append its segments with offset
+    # addresses of the datastore, i.e. clipped to the input region of the endpoint and rebased by its input offset
+    # Note: datagrams of unknown endpoints are dropped, e.g. of a replayed log that was recorded with more endpoints.
+    def parseEndpointDatagram(self, index, datagram, source, segments):
+        if index >= len(self.endpoints):
+            return
+        endpoint = self.endpoints[index]
+        first = len(segments)
+        self.parseDatagram(datagram, (index, source), segments)
+        if endpoint.input_size is not None:
+            size = endpoint.input_size
+            segments[first:] = [(endpoint.input_offset + offset, data[:size - offset]) for offset, data in segments[first:] if offset < size]
+        elif endpoint.input_offset:
+            segments[first:] = [(endpoint.input_offset + offset, data) for offset, data in segments[first:]]
+
+    # parse a received datagram and append its (offset, bytes) segments, source identifies the sender of the datagram
+    def parseDatagram(self, datagram, source, segments):
+        if len(datagram) < OFFSET_HEADER.size:
+            return
+        offset, = OFFSET_HEADER.unpack_from(datagram)
+        if offset == SEGMENTS_MARKER:
+            self.__parseSegments(datagram, segments)
+            return
+        if offset != FRAME_MARKER:
+            segments.append((offset, datagram[OFFSET_HEADER.size:]))
+            return
+        if len(datagram) < FRAME_HEADER.size:
+            return
+        _, frame, index, count, offset = FRAME_HEADER.unpack_from(datagram)
+        if index >= max(count, 1) or self.__isLateFrame(source, frame):
+            return
+        if count <= 1:
+            self.__applyFrame(source, frame)
+            segments.append((offset, datagram[FRAME_HEADER.size:]))
+            return
+
+        # keep a copy of the fragment (the receive buffer is reused) until all fragments of the frame arrived
+        pending = self.__pendingFrames.get(source)
+        if pending is None:
+            if len(self.__pendingFrames) >= MAX_FRAME_SOURCES:
+                del self.__pendingFrames[next(iter(self.__pendingFrames))]
+            pending = self.__pendingFrames[source] = {}
+        fragments = pending.get(frame)
+        if fragments is None:
+            if len(pending) >= MAX_PENDING_FRAMES:
+                del pending[next(iter(pending))]
+            fragments = pending[frame] = {}
+        fragments[index] = (offset, bytes(datagram[FRAME_HEADER.size:]))
+        if len(fragments) < count:
+            return
+        self.__applyFrame(source, frame)
+        segments.extend(fragments[i] for i in range(count))
+
+    # check whether a frame of a source is not newer than the last applied frame of the source (with wrap-around of the
+    # frame ids), such a frame is dropped so that older data never overwrites newer data
+    def __isLateFrame(self, source, frame):
+        last = self.__lastFrames.get(source)
+        if last is None:
+            return False
+        return ((last - frame) & 0xFFFFFFFF) <= FRAME_REORDER_WINDOW
+
+    # mark a frame of a source as applied and drop all incomplete frames of the source that are older
+    def __applyFrame(self, source, frame):
+        if source not in self.__lastFrames and len(self.__lastFrames) >= MAX_FRAME_SOURCES:
+            oldest = next(iter(self.__lastFrames))
+            del self.__lastFrames[oldest]
+            self.__pendingFrames.pop(oldest, None)
+        self.__lastFrames[source] = frame
+        pending = self.__pendingFrames.get(source)
+        if pending:
+            for other in [other for other in pending if ((frame - other) & 0xFFFFFFFF) < 0x80000000]:
+                del pending[other]
+        if not pending:
+            self.__pendingFrames.pop(source, None)
+
+    # append all segments of a multi-segment datagram, a truncated datagram is dropped entirely
+    def __parseSegments(self, datagram, segments):
+        if len(datagram) < SEGMENTS_HEADER.size:
+            return
+        _, count = SEGMENTS_HEADER.unpack_from(datagram)
+        position = SEGMENTS_HEADER.size
+        size = len(datagram)
+        parsed = []
+        for _ in range(count):
+            if position + SEGMENT_HEADER.size > size:
+                return
+            offset, length = SEGMENT_HEADER.unpack_from(datagram, position)
+            position += SEGMENT_HEADER.size
+            if position + length > size:
+                return
+            parsed.append((offset, datagram[position:position + length]))
+            position += length
+        segments.extend(parsed)
+
+    # append all received datagrams to a datagram log file
+    def startRecording(self, filename):
+        self.stopRecording()
+        self.__recorder = DatagramRecorder(filename)
+
+    def stopRecording(self):
+        recorder = self.__recorder
+        self.__recorder = None
+        if recorder is not None:
+            recorder.close()
+
+    # Sender thread entry point: send output data on a drift-free monotonic schedule and on request in between.
+    # Note: the switch interval of the interpreter bounds the delay of a send until this thread gets the GIL, see main.py.
+    def __sendLoop(self):
+        next_time = time.perf_counter()
+        while self._running.is_set():
+            next_time += self.send_period
+            remaining = next_time - time.perf_counter()
+            while remaining > SEND_SPIN_TIME and self._running.is_set():
+                if self.__sendEvent.wait(remaining - SEND_SPIN_TIME) and self._running.is_set():
+                    self.__sendRequestedOutput(next_time)
+                remaining = next_time - time.perf_counter()
+            while time.perf_counter() < next_time and self._running.is_set():
+                time.sleep(0)
+            if not self._running.is_set():
+                break
+            self.sendOutputData()
+            self.__lastSendTime = time.perf_counter()
+
+            # skip missed deadlines instead of sending a burst of outputs
+            now = time.perf_counter()
+            if now - next_time > self.send_period:
+                self.sendOverruns += 1
+                next_time = now
+
+    # send requested output data immediately, unless the last send is less than min_request_interval ago
+    # Note: the request is cleared before the output data is read, so that a later request is not lost. Requests within
+    # min_request_interval are delayed and sent together, or with the next scheduled send (at next_time) if it is due
+    # earlier.
+    def __sendRequestedOutput(self, next_time):
+        earliest = self.__lastSendTime + self.min_request_interval
+        self.__sendEvent.clear()
+        if earliest >= next_time - SEND_SPIN_TIME:
+            return
+        delay = earliest - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.sendOutputData()
+        self.__lastSendTime = time.perf_counter()
 
     # Stop the thread
     def stop(self):
         self._running.clear()
-        try:
-            if self._sock:
-                self._sock.close()
-        except Exception:
-            pass
+        datastore.remove_output_request_event(self.__sendEvent)
+        self.__sendEvent.set()
+        self.stopRecording()
+        self.__closeSockets()
 
-    # Send a binary message to the multicast group
+    # Send a binary message with the output data region of each endpoint to its multicast group
+    # Note: an error of one endpoint does not affect the other endpoints.
     def sendOutputData(self):
         try:
-            msg_bytes = datastore.get_output()
-            self._sock.sendto(msg_bytes, (self.group, self.dest_port))
+            if self.announce_layout:
+                self.__announceLayout()
+            output = datastore.get_output()
         except Exception:
-            pass
+            return
+        if output is None:
+            return
+        for index, endpoint in enumerate(self.endpoints):
+            try:
+                self.__sendEndpointOutput(index, endpoint, output)
+            except Exception:
+                pass
+
+    # send the output data region of an endpoint
+    def __sendEndpointOutput(self, index, endpoint, output):
+        if endpoint.output_size == 0:
+            return
+        if endpoint.output_offset == 0 and endpoint.output_size is None:
+            msg_bytes = output
+        else:
+            end = len(output) if endpoint.output_size is None else endpoint.output_offset + endpoint.output_size
+            msg_bytes = output[endpoint.output_offset:end]
+        if self.output_mode == 'delta':
+            messages = self.__packRegions(msg_bytes, self.__changedRegions(index, msg_bytes))
+        elif self.fragment_output or self.frame_id or len(msg_bytes) > MAX_DATAGRAM_SIZE:
+            messages = self.__packRegions(msg_bytes, [(0, len(msg_bytes))])
+        else:
+            messages = [msg_bytes]
+        for message in messages:
+            self.__send(message, endpoint)
+
+    # send a message to the multicast group of an endpoint, a failed send is counted and does not affect other messages
+    def __send(self, message, endpoint):
+        try:
+            self.__sendSock.sendto(message, (endpoint.group, endpoint.dest_port))
+        except OSError:
+            self.sendErrors += 1
+
+    # send a layout announcement to all endpoints, if the last announcement is older than the keepalive period
+    def __announceLayout(self):
+        now = time.monotonic()
+        if now - self.__lastAnnouncement < self.keepalive_period:
+            return
+        self.__lastAnnouncement = now
+        message = LAYOUT_MESSAGE.pack(LAYOUT_MARKER, datastore.get_layout_hash(), *datastore.get_data_sizes())
+        for endpoint in self.endpoints:
+            self.__send(message, endpoint)
+
+    # get all regions [start, end) of the output data of an endpoint that changed since the last call
+    def __changedRegions(self, index, output):
+        now = time.monotonic()
+        last_output = self.__lastOutputs[index]
+        self.__lastOutputs[index] = output
+        if last_output is None or len(last_output) != len(output) or (now - self.__lastKeepalives[index]) >= self.keepalive_period:
+            self.__lastKeepalives[index] = now
+            return [(0, len(output))]
+
+        # find changed bytes and merge them to regions
+        # Note: numpy is only imported in delta output mode, it is not needed otherwise.
+        import numpy as np
+        changed = np.flatnonzero(np.frombuffer(output, dtype=np.uint8) != np.frombuffer(last_output, dtype=np.uint8))
+        if not changed.size:
+            return []
+        breaks = np.flatnonzero(np.diff(changed) > DELTA_MERGE_GAP + 1)
+        starts = np.concatenate(([changed[0]], changed[breaks + 1]))
+        ends = np.concatenate((changed[breaks], [changed[-1]])) + 1
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    # check that the output data region of each endpoint fits into one frame with max_message_size bytes per fragment
+    # Note: the output data of the datastore must be allocated.
+    def __checkFrameSize(self):
+        output_data_size = datastore.get_data_sizes()[1]
+        payload_size = self.max_message_size - FRAME_HEADER.size
+        for endpoint in self.endpoints:
+            size = max(0, output_data_size - endpoint.output_offset) if endpoint.output_size is None else endpoint.output_size
+            if -(-size // payload_size) > MAX_FRAME_FRAGMENTS:
+                raise ValueError("The output data of " + str(size) + " bytes exceeds " + str(MAX_FRAME_FRAGMENTS) + " fragments of a frame, the maximum message size must be at least " + str(-(-size // MAX_FRAME_FRAGMENTS) + FRAME_HEADER.size) + " bytes")
+
+    # pack regions [start, end) of the output data to messages of at most max_message_size bytes
+    # Note: if the changed regions of a frame need more than MAX_FRAME_FRAGMENTS fragments, the entire output is sent.
+    def __packRegions(self, output, regions):
+        header = FRAME_HEADER if self.frame_id else OFFSET_HEADER
+        payload_size = self.max_message_size - header.size
+        fragments = []
+        for start, end in regions:
+            fragments.extend((offset, min(offset + payload_size, end)) for offset in range(start, max(end, start + 1), payload_size))
+        if not self.frame_id:
+            return [OFFSET_HEADER.pack(start) + output[start:end] for start, end in fragments]
+        if len(fragments) > MAX_FRAME_FRAGMENTS:
+            fragments = [(offset, min(offset + payload_size, len(output))) for offset in range(0, max(len(output), 1), payload_size)]
+        frame = self.__frameCounter
+        self.__frameCounter = (self.__frameCounter + 1) & 0xFFFFFFFF
+        count = len(fragments)
+        return [FRAME_HEADER.pack(FRAME_MARKER, frame, index, count, start) + output[start:end] for index, (start, end) in enumerate(fragments)]
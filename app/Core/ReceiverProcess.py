@@ -0,0 +1,82 @@
+import multiprocessing
+
+
+# spawn a fresh interpreter instead of forking the GUI process with its Qt threads
+_context = multiprocessing.get_context('spawn')
+
+
+# Process that runs a network manager on the shared memory of the datastore, so that receiving and sending does not
+# share the GIL with rendering. It provides the receive counters and stop() of a network manager to the GUI process.
+# Requests for immediate output (datastore.request_output() in the GUI process) are passed to the sender thread of the
+# network manager by an event that is shared between both processes.
+# Note: shared_memory_name is the name returned by datastore.share_memory(), all keyword arguments are passed to the
+# network manager. If record is given, all received datagrams are appended to that datagram log file.
+class ReceiverProcess(_context.Process):
+    def __init__(self, shared_memory_name, record=None, **kwargs):
+        super().__init__(daemon=True)
+        # invalid arguments raise an error in this process instead of stopping the receiver process
+        from Core.NetworkManager import NetworkManager
+        NetworkManager(**kwargs)
+        self.shared_memory_name = shared_memory_name
+        self.record = record
+        self.networkArgs = kwargs
+        self._running = _context.Event()
+        self._running.set()
+        self.__outputRequest = _context.Event()
+        self.__receivedDatagrams = _context.Value('Q', 0, lock=False)
+        self.__receivedBytes = _context.Value('Q', 0, lock=False)
+        self.__sendOverruns = _context.Value('Q', 0, lock=False)
+        self.__sendErrors = _context.Value('Q', 0, lock=False)
+
+    @property
+    def receivedDatagrams(self):
+        return self.__receivedDatagrams.value
+
+    @property
+    def receivedBytes(self):
+        return self.__receivedBytes.value
+
+    @property
+    def sendOverruns(self):
+        return self.__sendOverruns.value
+
+    @property
+    def sendErrors(self):
+        return self.__sendErrors.value
+
+    def start(self):
+        from Core.Datastore import datastore
+        datastore.add_output_request_event(self.__outputRequest)
+        super().start()
+
+    # Process entry point: attach to the shared memory and run the network manager until stop() is called.
+    def run(self):
+        from Core.Datastore import datastore
+        from Core.NetworkManager import NetworkManager
+        datastore.attach_shared_memory(self.shared_memory_name, track=True)
+        network_manager = NetworkManager(output_request=self.__outputRequest, **self.networkArgs)
+        if self.record:
+            network_manager.startRecording(self.record)
+        network_manager.start()
+
+        # publish the counters periodically
+        while self._running.is_set() and network_manager.is_alive():
+            self.__receivedDatagrams.value = network_manager.receivedDatagrams
+            self.__receivedBytes.value = network_manager.receivedBytes
+            self.__sendOverruns.value = network_manager.sendOverruns
+            self.__sendErrors.value = network_manager.sendErrors
+            network_manager.join(0.1)
+        network_manager.stop()
+        network_manager.join(1.0)
+        datastore.close_shared_memory()
+
+    def stop(self):
+        from Core.Datastore import datastore
+        datastore.remove_output_request_event(self.__outputRequest)
+        self._running.clear()
+        self.join(2.0)
+        if self.is_alive():
+            # the process may be terminated during a write
+            self.terminate()
+            self.join(1.0)
+            datastore.recover_interrupted_write()
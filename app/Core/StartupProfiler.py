@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager
+
+
+# Profiler of the application startup: durations of startup phases, of lazily imported modules and of the construction
+# of dashboard widgets per class. Phases and imports are always recorded, constructions only while enabled.
+# Note: the duration of an import includes all modules imported by it.
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.startTime = time.perf_counter()
+        self.__phases = []
+        self.__imports = []
+        self.__constructions = {}
+
+    def enable(self):
+        self.enabled = True
+
+    # context manager that records the duration of a startup phase
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__phases.append((name, time.perf_counter() - t0))
+
+    # record the duration of importing a module
+    def recordImport(self, name, duration):
+        self.__imports.append((name, duration))
+
+    # record the duration of the construction of a widget
+    def recordConstruction(self, widget, duration):
+        name = widget.__class__.__name__
+        count, total = self.__constructions.get(name, (0, 0.0))
+        self.__constructions[name] = (count + 1, total + duration)
+
+    # measure the construction duration of all instances of a widget class
+    # Note: the constructor is overridden by a class attribute, the original constructor is called by the wrapper.
+    def instrumentWidgetClass(self, cls):
+        if not self.enabled or '_startupInstrumented' in cls.__dict__:
+            return
+        init = cls.__init__
+        def timedInit(widget, *args, **kwargs):
+            t0 = time.perf_counter()
+            init(widget, *args, **kwargs)
+            if type(widget) is cls:
+                self.recordConstruction(widget, time.perf_counter() - t0)
+        cls.__init__ = timedInit
+        cls._startupInstrumented = True
+
+    # get the startup profile as human-readable text
+    def formatReport(self):
+        lines = ["startup: %.1f ms since start of the profiler" % ((time.perf_counter() - self.startTime) * 1000.0)]
+        for name, duration in self.__phases:
+            lines.append("  phase %-40s %8.1f ms" % (name, duration * 1000.0))
+        for name, duration in sorted(self.__imports, key=lambda item: item[1], reverse=True):
+            lines.append("  import %-39s %8.1f ms" % (name, duration * 1000.0))
+        for name, (count, total) in sorted(self.__constructions.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append("  construct %-36s %8.1f ms (%d x)" % (name, total * 1000.0, count))
+        return '\n'.join(lines)
+
+
+# global startup profiler instance
+startupProfiler = StartupProfiler()
@@ -1,7 +1,25 @@
-# import all core modules here
-# the syntax is: from .<filename> import <classname>
+# register all core classes here, a core module is imported on first use of one of its classes
+# the syntax is: '<classname>': '<filename>'
+from .LazyRegistry import makeLazyRegistry
 
-from .DashboardWidget import DashboardWidget
-from .Datastore import Datastore
-from .MainDashboard import MainDashboard
-from .NetworkManager import NetworkManager
+_coreModules = {
+    'AsyncRenderer': 'AsyncRenderer',
+    'DashboardWidget': 'DashboardWidget',
+    'DataField': 'DataField',
+    'DatagramRecorder': 'DatagramLog',
+    'DatagramReplayer': 'DatagramLog',
+    'FrameScheduler': 'FrameScheduler',
+    'Datastore': 'Datastore',
+    'MainDashboard': 'MainDashboard',
+    'Metrics': 'Metrics',
+    'MetricsOverlay': 'MetricsOverlay',
+    'Endpoint': 'NetworkManager',
+    'LayeredWidget': 'AsyncRenderer',
+    'NetworkManager': 'NetworkManager',
+    'ReceiverProcess': 'ReceiverProcess',
+    'RenderJob': 'AsyncRenderer',
+    'StartupProfiler': 'StartupProfiler'
+}
+
+# import the module of a core class on first access, e.g. "from Core import NetworkManager"
+makeLazyRegistry(__name__, _coreModules)
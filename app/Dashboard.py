@@ -1,6 +1,6 @@
-from PyQt5.QtWidgets import *
-from Core import *
-from DashboardWidgets import *
+from PyQt5.QtWidgets import QGridLayout
+from Core import MainDashboard
+from DashboardWidgets import PushButton, VectorPlot, RudderPlot, NumericDisplayInt32, NumericDisplayFloat32
 
 
 class Dashboard(MainDashboard):
@@ -1,47 +1,48 @@
-import numpy as np
 from PyQt5.QtWidgets import QLineEdit, QSizePolicy
-from PyQt5.QtGui import QColor
-from Core import *
+from PyQt5.QtGui import QColor, QPalette
+from Core import DashboardWidget, DataField
 from PyQt5.QtGui import QMouseEvent
 
 
 class NumericDisplayInt32(QLineEdit, DashboardWidget):
+    # memory layout of input data
+    inputFields = [
+        DataField('value', 'int32'),
+        DataField('foregroundColor', 'uint8', 3),
+        DataField('backgroundColor', 'uint8', 3)
+    ]
+
     def __init__(self, parent=None):
         QLineEdit.__init__(self, parent=parent)
         self.setReadOnly(True)
         self.mousePressEvent = self.disable_mouse_event
         self.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
-        self.__backgroundColor = QColor("#FFFFFF")
-        self.__foregroundColor = QColor("#000000")
-        self.__applyStyle()
-
-    # get memory size for input and output data
-    def requiredIODatastoreSize(self):
-        return (10, 0)  # input size, output size
+        self.__foregroundColor = (0, 0, 0)
+        self.__backgroundColor = (255, 255, 255)
+        self.__applyColors()
 
     # serialize output data to bytes
     def packOutput(self):
         return bytearray(0)  # no output data
 
-    # deserialize input data from bytes
-    def unpackInput(self, data):
-        if len(data) != 10:
-            return
-        value = np.frombuffer(data[0:4], dtype=np.int32)[0]
-        f_red = np.uint8(data[4])
-        f_green = np.uint8(data[5])
-        f_blue = np.uint8(data[6])
-        b_red = np.uint8(data[7])
-        b_green = np.uint8(data[8])
-        b_blue = np.uint8(data[9])
-        self.__foregroundColor = QColor(f_red, f_green, f_blue)
-        self.__backgroundColor = QColor(b_red, b_green, b_blue)
-        self.setText(str(value))
-        self.__applyStyle()
+    # set the input data from the values of the input fields
+    def unpackInputValues(self, values):
+        value, foreground, background = values
+        if foreground != self.__foregroundColor or background != self.__backgroundColor:
+            self.__foregroundColor = foreground
+            self.__backgroundColor = background
+            self.__applyColors()
+        text = str(value)
+        if text != self.text():
+            self.setText(text)
 
     def disable_mouse_event(self, event: QMouseEvent):
         pass
 
-    def __applyStyle(self):
-        self.setStyleSheet("color: " + self.__foregroundColor.name() + "; background-color: " + self.__backgroundColor.name() + ";")
+    # colors are applied via the palette, which avoids re-parsing and re-polishing a widget stylesheet
+    def __applyColors(self):
+        palette = self.palette()
+        palette.setColor(QPalette.Text, QColor(*self.__foregroundColor))
+        palette.setColor(QPalette.Base, QColor(*self.__backgroundColor))
+        self.setPalette(palette)
 
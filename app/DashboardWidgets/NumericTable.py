@@ -0,0 +1,155 @@
+from PyQt5.QtGui import QPainter, QColor, QStaticText, QFontMetrics, QTransform
+from PyQt5.QtCore import QEvent, QRect, QSize, QPointF, pyqtProperty
+from PyQt5.QtWidgets import QWidget, QSizePolicy
+from Core import DashboardWidget, DataField
+
+
+class NumericTable(QWidget, DashboardWidget):
+    # only changed cells are repainted, see unpackInputValues()
+    repaintOnInput = False
+
+    # QColor objects for all cell colors that have been used so far, given as (red, green, blue) -> QColor
+    __colors = {}
+
+    # Note: the memory layout of the input data depends on the number of cells, the input fields are set per instance:
+    # the values of all cells (row by row) of the given data type, followed by the foreground and background colors of
+    # all cells (3 x uint8 per cell). All cells are painted by one paint event, the texts are laid out once per change
+    # and only changed cells are repainted. Optional labels (one per cell) are shown left-aligned in the cells.
+    def __init__(self, rows=10, columns=1, dtype='float32', num_digits=4, labels=None, parent=None):
+        self.rows = max(1, int(rows))
+        self.columns = max(1, int(columns))
+        self.__numCells = self.rows * self.columns
+        self.inputFields = [
+            DataField('values', dtype, self.__numCells),
+            DataField('foregroundColors', 'uint8', 3 * self.__numCells),
+            DataField('backgroundColors', 'uint8', 3 * self.__numCells)
+        ]
+        self.__isFloat = dtype in ('float32', 'float64')
+        QWidget.__init__(self, parent=parent)
+        self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Preferred)
+        self.__numDigits = num_digits
+
+        # cell state: formatted texts with their cached layout, colors and the geometry of all cells
+        self.__texts = [None] * self.__numCells
+        self.__staticTexts = [QStaticText() for _ in range(self.__numCells)]
+        self.__foregroundColors = [(0, 0, 0)] * self.__numCells
+        self.__backgroundColors = [(255, 255, 255)] * self.__numCells
+        self.__labels = [QStaticText(str(label)) for label in labels] if labels else []
+        for label in self.__labels:
+            label.prepare(QTransform(), self.font())
+        self.__cellRects = []
+
+        # default colors (can be overridden via qproperty-<name> in stylesheets)
+        self.__gridColor = "#d4d9e2"
+
+    # serialize output data to bytes
+    def packOutput(self):
+        return bytearray(0)  # no output data
+
+    # set the input data from the values of the input fields and schedule a repaint of all changed cells
+    def unpackInputValues(self, values):
+        values, foregrounds, backgrounds = values
+        if self.__numCells == 1:
+            values = (values,)
+        cellRects = self.__getCellRects()
+        for index, value in enumerate(values):
+            text = str(round(value, self.__numDigits)) if self.__isFloat else str(value)
+            foreground = foregrounds[3 * index:3 * index + 3]
+            background = backgrounds[3 * index:3 * index + 3]
+            if text == self.__texts[index] and foreground == self.__foregroundColors[index] and background == self.__backgroundColors[index]:
+                continue
+            if text != self.__texts[index]:
+                self.__texts[index] = text
+                self.__staticTexts[index].setText(text)
+                self.__staticTexts[index].prepare(QTransform(), self.font())
+            self.__foregroundColors[index] = foreground
+            self.__backgroundColors[index] = background
+            self.update(cellRects[index])
+
+    # get the displayed text of a cell
+    def cellText(self, row, column):
+        return self.__texts[row * self.columns + column] or ''
+
+    # ---------------------- Qt properties for stylesheet control ----------------------
+    def getGridColor(self):
+        return self.__gridColor
+
+    def setGridColor(self, value):
+        if value == self.__gridColor:
+            return
+        self.__gridColor = value
+        self.update()
+
+    gridColor = pyqtProperty(str, fget=getGridColor, fset=setGridColor)
+
+    def sizeHint(self):
+        metrics = QFontMetrics(self.font())
+        labelWidth = max((label.size().width() for label in self.__labels), default=0.0)
+        cellWidth = metrics.horizontalAdvance('-0000.' + '0' * max(0, int(self.__numDigits))) + int(labelWidth) + 12
+        return QSize(self.columns * cellWidth, self.rows * (metrics.height() + 6))
+
+    # all rows keep the height of one line of text, e.g. a large table in a scrollable page is scrolled instead of
+    # being squeezed to the height of the page
+    def minimumSizeHint(self):
+        metrics = QFontMetrics(self.font())
+        return QSize(self.columns * (metrics.horizontalAdvance('-0.0') + 8), self.rows * (metrics.height() + 2))
+
+    def resizeEvent(self, e):
+        self.__cellRects = []
+        super().resizeEvent(e)
+
+    def changeEvent(self, e):
+        # the cached text layouts depend on the font, e.g. if it is set by a stylesheet
+        if e.type() == QEvent.FontChange:
+            for staticText in self.__staticTexts + self.__labels:
+                staticText.prepare(QTransform(), self.font())
+            self.update()
+        super().changeEvent(e)
+
+    # get the rectangles of all cells (row by row) for the current size, the last row and column take the remainder
+    def __getCellRects(self):
+        if not self.__cellRects:
+            width, height = self.width(), self.height()
+            xs = [column * width // self.columns for column in range(self.columns + 1)]
+            ys = [row * height // self.rows for row in range(self.rows + 1)]
+            self.__cellRects = [QRect(xs[column], ys[row], xs[column + 1] - xs[column], ys[row + 1] - ys[row]) for row in range(self.rows) for column in range(self.columns)]
+        return self.__cellRects
+
+    def __getColor(self, rgb):
+        color = self.__colors.get(rgb)
+        if color is None:
+            color = self.__colors[rgb] = QColor(*rgb)
+        return color
+
+    # paint all cells that intersect the region to update in one pass: grid, background, label and value
+    def paintEvent(self, event):
+        region = event.region()
+        bounds = region.boundingRect()
+        cellRects = self.__getCellRects()
+        firstRow = max(0, bounds.top() * self.rows // max(1, self.height()) - 1)
+        lastRow = min(self.rows - 1, bounds.bottom() * self.rows // max(1, self.height()) + 1)
+        firstColumn = max(0, bounds.left() * self.columns // max(1, self.width()) - 1)
+        lastColumn = min(self.columns - 1, bounds.right() * self.columns // max(1, self.width()) + 1)
+        gridColor = QColor(self.__gridColor)
+        padding = 4
+
+        painter = QPainter(self)
+        painter.setFont(self.font())
+        for row in range(firstRow, lastRow + 1):
+            for column in range(firstColumn, lastColumn + 1):
+                index = row * self.columns + column
+                rect = cellRects[index]
+                if not region.intersects(rect):
+                    continue
+
+                # the grid is the part of the cell that is not covered by the background (right and bottom line)
+                painter.fillRect(rect, gridColor)
+                painter.fillRect(rect.adjusted(0, 0, -1, -1), self.__getColor(self.__backgroundColors[index]))
+                painter.setPen(self.__getColor(self.__foregroundColors[index]))
+                if index < len(self.__labels):
+                    label = self.__labels[index]
+                    painter.drawStaticText(QPointF(rect.left() + padding, rect.top() + (rect.height() - label.size().height()) / 2), label)
+                staticText = self.__staticTexts[index]
+                size = staticText.size()
+                painter.drawStaticText(QPointF(rect.right() - padding - size.width(), rect.top() + (rect.height() - size.height()) / 2), staticText)
+        painter.end()
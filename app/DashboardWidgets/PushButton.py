@@ -1,63 +1,65 @@
-import numpy as np
 from PyQt5.QtWidgets import QPushButton
 from PyQt5.QtGui import QColor
-from Core import *
+from Core import DashboardWidget, DataField
 
 
 class PushButton(QPushButton, DashboardWidget):
+    # memory layout of input and output data
+    inputFields = [
+        DataField('color', 'uint8', 3)
+    ]
+    outputFields = [
+        DataField('isPressed', 'uint8'),
+        DataField('counter', 'uint8')
+    ]
+
+    # stylesheets for all base colors that have been used so far, given as (red, green, blue) -> stylesheet
+    __styleSheets = {}
+
     def __init__(self, text, parent=None):
         QPushButton.__init__(self, text=text, parent=parent)
-        self.counter = np.uint8(0)
+        self.counter = 0
         self.__isPressed = False
-        self.__baseColor = QColor("#3d3f46")
+        self.__baseColor = (0x3d, 0x3f, 0x46)
         self.__applyStyle()
 
-    # get memory size for input and output data
-    def requiredIODatastoreSize(self):
-        return (3, 2)  # input size, output size
-
     # serialize output data to bytes
     def packOutput(self):
-        data = bytearray(2)
-        data[0] = self.__isPressed
-        data[1] = self.counter
-        return data
-
-    # deserialize input data from bytes
-    def unpackInput(self, data):
-        if len(data) != 3:
-            return
-        red = np.uint8(data[0])
-        green = np.uint8(data[1])
-        blue = np.uint8(data[2])
-        self.__baseColor = QColor(red, green, blue)
-        self.__applyStyle()
+        return self.outputCodec.pack(self.__isPressed, self.counter)
+
+    # set the input data from the values of the input fields
+    def unpackInputValues(self, values):
+        color, = values
+        if color != self.__baseColor:
+            self.__baseColor = color
+            self.__applyStyle()
     
-    # override mouse press and release events to update the button state and style
+    # override mouse press and release events to update the button state, which is sent immediately
     def mousePressEvent(self, event):
-        self.counter = np.uint8(self.counter + 1)
+        self.counter = (self.counter + 1) & 0xFF
         self.__isPressed = True
-        self.__applyStyle()
-        self.update()
+        self.requestOutput()
         super().mousePressEvent(event)
 
     def mouseReleaseEvent(self, event):
         self.__isPressed = False
-        self.__applyStyle()
-        self.update()
+        self.requestOutput()
         super().mouseReleaseEvent(event)
 
+    # the pressed state is styled via the :pressed pseudo-state, so the stylesheet only changes with the base color
     def __applyStyle(self):
-        # calculate brightness using the luminance formula
-        brightness = (0.299 * self.__baseColor.red() +
-                      0.587 * self.__baseColor.green() +
-                      0.114 * self.__baseColor.blue())
-        str_text_color = "color: black;"
-        if brightness < 128:
-            str_text_color = "color: white;"
-        if self.__isPressed:
-            darkened_color = self.__baseColor.darker(120)
-            self.setStyleSheet("background-color: " + darkened_color.name() + "; " + str_text_color)
-        else:
-            self.setStyleSheet("background-color: " + self.__baseColor.name() + "; " + str_text_color)
+        style_sheet = self.__styleSheets.get(self.__baseColor)
+        if style_sheet is None:
+            base_color = QColor(*self.__baseColor)
 
+            # calculate brightness using the luminance formula
+            brightness = (0.299 * base_color.red() +
+                          0.587 * base_color.green() +
+                          0.114 * base_color.blue())
+            str_text_color = "color: black;"
+            if brightness < 128:
+                str_text_color = "color: white;"
+            style_sheet = ("QPushButton { background-color: " + base_color.name() + "; " + str_text_color + " } " +
+                           "QPushButton:pressed { background-color: " + base_color.darker(120).name() + "; }")
+            self.__styleSheets[self.__baseColor] = style_sheet
+        self.setStyleSheet(style_sheet)
@@ -1,24 +1,32 @@
 import math
-import numpy as np
 from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QPainterPath
 from PyQt5.QtCore import Qt, pyqtProperty
 from PyQt5.QtWidgets import QWidget
-from Core import *
+from Core import DashboardWidget, DataField
+from Core.AsyncRenderer import LayeredWidget
 
 
-class RudderPlot(QWidget, DashboardWidget):
+class RudderPlot(LayeredWidget, QWidget, DashboardWidget):
+    # memory layout of input data
+    inputFields = [
+        DataField('commandAngle', 'float32'),
+        DataField('commandThrottle', 'float32', minimum=-1.0, maximum=1.0),
+        DataField('actualAngle', 'float32'),
+        DataField('actualThrottle', 'float32', minimum=-1.0, maximum=1.0)
+    ]
+
     def __init__(self, parent=None):
         # call the constructor of the super class (QWidget)
         QWidget.__init__(self, parent=parent)
 
         # maximum angle range
-        self.maxAngleRange = np.deg2rad(35.0)
+        self.maxAngleRange = math.radians(35.0)
 
         # set default values
         self.__commandThrottle = 0.0
-        self.__commandAngle = np.deg2rad(0.0)
+        self.__commandAngle = math.radians(0.0)
         self.__actualThrottle = 0.0
-        self.__actualAngle = np.deg2rad(0.0)
+        self.__actualAngle = math.radians(0.0)
 
         # default colors (can be overridden by stylesheet via qproperty-...)
         self.__cmdColor = "#0066cc"
@@ -31,24 +39,18 @@ class RudderPlot(QWidget, DashboardWidget):
         self.__rulerSolid = "#d4d9e2"
         self.__borderColor = "#cad0d7"
 
-    # get memory size for input and output data
-    def requiredIODatastoreSize(self):
-        return (16, 0)  # input size, output size
+        # cached static layers and asynchronous rendering of frames, if it is enabled
+        LayeredWidget.__init__(self)
 
     # serialize output data to bytes
     def packOutput(self):
         return bytearray(0)  # no output data
 
-    # deserialize input data from bytes
-    def unpackInput(self, data):
-        if len(data) != 16:
-            return
-        self.__commandAngle = np.frombuffer(data[0:4], dtype=np.float32)[0]
-        self.__commandThrottle = np.frombuffer(data[4:8], dtype=np.float32)[0]
-        self.__actualAngle = np.frombuffer(data[8:12], dtype=np.float32)[0]
-        self.__actualThrottle = np.frombuffer(data[12:16], dtype=np.float32)[0]
-        self.__commandThrottle = min(max(self.__commandThrottle, -1.0), 1.0)
-        self.__actualThrottle = min(max(self.__actualThrottle, -1.0), 1.0)
+    # set the input data from the values of the input fields
+    def unpackInputValues(self, values):
+        (self.__commandAngle, self.__commandThrottle,
+         self.__actualAngle, self.__actualThrottle) = values
+        self.requestFrame()
 
     # ---------------------- Qt properties for stylesheet control ----------------------
     def getCmdColor(self):
@@ -102,7 +104,7 @@ class RudderPlot(QWidget, DashboardWidget):
         if value == self.__backgroundInner:
             return
         self.__backgroundInner = value
-        self.update()
+        self.invalidateStaticLayers()
 
     backgroundInner = pyqtProperty(str, fget=getBackgroundInner, fset=setBackgroundInner)
 
@@ -113,7 +115,7 @@ class RudderPlot(QWidget, DashboardWidget):
         if value == self.__backgroundOuter:
             return
         self.__backgroundOuter = value
-        self.update()
+        self.invalidateStaticLayers()
 
     backgroundOuter = pyqtProperty(str, fget=getBackgroundOuter, fset=setBackgroundOuter)
 
@@ -124,7 +126,7 @@ class RudderPlot(QWidget, DashboardWidget):
         if value == self.__rulerDash:
             return
         self.__rulerDash = value
-        self.update()
+        self.invalidateStaticLayers()
 
     rulerDash = pyqtProperty(str, fget=getRulerDash, fset=setRulerDash)
 
@@ -135,7 +137,7 @@ class RudderPlot(QWidget, DashboardWidget):
         if value == self.__rulerSolid:
             return
         self.__rulerSolid = value
-        self.update()
+        self.invalidateStaticLayers()
 
     rulerSolid = pyqtProperty(str, fget=getRulerSolid, fset=setRulerSolid)
 
@@ -146,35 +148,24 @@ class RudderPlot(QWidget, DashboardWidget):
         if value == self.__borderColor:
             return
         self.__borderColor = value
-        self.update()
+        self.invalidateStaticLayers()
 
     borderColor = pyqtProperty(str, fget=getBorderColor, fset=setBorderColor)
 
-    # paint event: This function is called, if the widget needs to be repainted
-    def paintEvent(self, e):
-        # first, we ensure, that all values are in a valid range
-        self.__commandThrottle = min(max(self.__commandThrottle, -1.0), 1.0)
-        self.__actualThrottle = min(max(self.__actualThrottle, -1.0), 1.0)
-        self.__commandAngle = min(max(self.__commandAngle, -self.maxAngleRange), self.maxAngleRange)
-        self.__actualAngle = min(max(self.__actualAngle, -self.maxAngleRange), self.maxAngleRange)
-
-        # scale real angles to the range of visible angles (45 deg)
-        angleCMD = -self.__commandAngle / self.maxAngleRange * np.deg2rad(45.0)
-        angleACT = -self.__actualAngle / self.maxAngleRange * np.deg2rad(45.0)
+    # get the colors of the static layers
+    def getStaticLayersKey(self):
+        return (self.__backgroundInner, self.__backgroundOuter, self.__rulerDash, self.__rulerSolid, self.__borderColor)
 
+    # calculate all kinds of radii and line widths for the given widget size
+    def computeGeometry(self, width, height):
         # relative percentage of geometrical sizes with respect to maximum radius
         percentBorder = 0.04
         percentGridBorder = 0.02
         percentLineWidthThrottle = 0.09
         percentLineWidthAngle = 0.02
 
-        # create painter object and enable anti-aliasing
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
-
         # get maximum allowed radius for whole content
-        maxRadius = math.floor(min(painter.device().width(), painter.device().height()) / 2.0)
+        maxRadius = math.floor(min(width, height) / 2.0)
 
         # calculate all kinds of radii and line widths and ensure that some values are multiple values of 2 or 4
         center = maxRadius
@@ -186,11 +177,18 @@ class RudderPlot(QWidget, DashboardWidget):
         lineWidthThrottleACT = math.floor(lineWidthThrottleCMD / 2)
         lineWidthAngle = math.floor(maxRadius * percentLineWidthAngle)
         rulerMaxRadius = radius - border / 2 - lineWidthThrottleCMD
+        return (center, border, radius, lineWidthGrid, lineWidthThrottleCMD, lineWidthThrottleACT, lineWidthAngle, rulerMaxRadius)
+
+    # paint the static background: background square, pies and ruler
+    def paintBackground(self, painter, geometry):
+        center, border, radius, lineWidthGrid, lineWidthThrottleCMD, lineWidthThrottleACT, lineWidthAngle, rulerMaxRadius = geometry
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
 
         # paint background square
         painter.setPen(Qt.NoPen)
         painter.setBrush(QBrush(QColor(self.__backgroundOuter), Qt.SolidPattern))
-        r = radius * np.sqrt(2.0) / 2.0
+        r = radius * math.sqrt(2.0) / 2.0
         painter.drawRect(int(center-r), int(center-r), int(2*r), int(2*r))
 
         # paint background of two pies
@@ -213,26 +211,14 @@ class RudderPlot(QWidget, DashboardWidget):
         painter.setPen(QPen(QColor(self.__rulerSolid), lineWidthGrid, Qt.SolidLine, Qt.FlatCap))
         painter.drawLine(int(center), int(center-radius), int(center), int(center+radius))
 
-        # paint reference lines for angles
-        painter.setBrush(Qt.NoBrush)
-        painter.setPen(QPen(QColor(self.__cmdRef), lineWidthAngle, Qt.DashLine, Qt.RoundCap))
-        x = rulerMaxRadius * np.sin(angleCMD)
-        y = rulerMaxRadius * np.cos(angleCMD)
-        painter.drawLine(int(center+x), int(center-y), int(center-x), int(center+y))
-        painter.setPen(QPen(QColor(self.__actRef), lineWidthAngle, Qt.DashLine, Qt.RoundCap))
-        x = rulerMaxRadius * np.sin(angleACT)
-        y = rulerMaxRadius * np.cos(angleACT)
-        painter.drawLine(int(center+x), int(center-y), int(center-x), int(center+y))
-
-        # paint throttle vectors
-        painter.setPen(QPen(QColor(self.__cmdColor), lineWidthThrottleCMD, Qt.SolidLine, Qt.RoundCap))
-        painter.drawLine(int(center), int(center), int(center + math.sin(angleCMD)*rulerMaxRadius*self.__commandThrottle), int(center - math.cos(angleCMD)*rulerMaxRadius*self.__commandThrottle))
-        painter.drawPoint(int(center), int(center))
-        painter.setPen(QPen(QColor(self.__actColor), lineWidthThrottleACT, Qt.SolidLine, Qt.RoundCap))
-        painter.drawLine(int(center), int(center), int(center + math.sin(angleACT)*rulerMaxRadius*self.__actualThrottle), int(center - math.cos(angleACT)*rulerMaxRadius*self.__actualThrottle))
-        painter.drawPoint(int(center), int(center))
+    # paint the static foreground: border around the whole widget
+    def paintForeground(self, painter, geometry):
+        center, border, radius, lineWidthGrid, lineWidthThrottleCMD, lineWidthThrottleACT, lineWidthAngle, rulerMaxRadius = geometry
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
 
         # paint a path as border around the whole widget
+        r = radius * math.sqrt(2.0) / 2.0
         path = QPainterPath()
         path.moveTo(int(center-r), int(center))
         path.lineTo(int(center-r), int(center+r))
@@ -243,3 +229,44 @@ class RudderPlot(QWidget, DashboardWidget):
         painter.setBrush(Qt.NoBrush)
         painter.setPen(QPen(QColor(self.__borderColor), border, Qt.SolidLine, Qt.RoundCap))
         painter.drawPath(path)
+
+    # paint the dynamic overlay for the given state (see getOverlayState()): reference lines for angles and throttle vectors
+    # Note: only the arguments are used, so that the overlay can be painted by a worker thread.
+    def paintOverlay(self, painter, geometry, state):
+        center, border, radius, lineWidthGrid, lineWidthThrottleCMD, lineWidthThrottleACT, lineWidthAngle, rulerMaxRadius = geometry
+        commandAngle, commandThrottle, actualAngle, actualThrottle, maxAngleRange, cmdColor, actColor, cmdRef, actRef = state
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
+
+        # scale real angles to the range of visible angles (45 deg)
+        angleCMD = -commandAngle / maxAngleRange * math.radians(45.0)
+        angleACT = -actualAngle / maxAngleRange * math.radians(45.0)
+
+        # paint reference lines for angles
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(QColor(cmdRef), lineWidthAngle, Qt.DashLine, Qt.RoundCap))
+        x = rulerMaxRadius * math.sin(angleCMD)
+        y = rulerMaxRadius * math.cos(angleCMD)
+        painter.drawLine(int(center+x), int(center-y), int(center-x), int(center+y))
+        painter.setPen(QPen(QColor(actRef), lineWidthAngle, Qt.DashLine, Qt.RoundCap))
+        x = rulerMaxRadius * math.sin(angleACT)
+        y = rulerMaxRadius * math.cos(angleACT)
+        painter.drawLine(int(center+x), int(center-y), int(center-x), int(center+y))
+
+        # paint throttle vectors
+        painter.setPen(QPen(QColor(cmdColor), lineWidthThrottleCMD, Qt.SolidLine, Qt.RoundCap))
+        painter.drawLine(int(center), int(center), int(center + math.sin(angleCMD)*rulerMaxRadius*commandThrottle), int(center - math.cos(angleCMD)*rulerMaxRadius*commandThrottle))
+        painter.drawPoint(int(center), int(center))
+        painter.setPen(QPen(QColor(actColor), lineWidthThrottleACT, Qt.SolidLine, Qt.RoundCap))
+        painter.drawLine(int(center), int(center), int(center + math.sin(angleACT)*rulerMaxRadius*actualThrottle), int(center - math.cos(angleACT)*rulerMaxRadius*actualThrottle))
+        painter.drawPoint(int(center), int(center))
+
+    # get the state of the dynamic overlay: values, angle range and colors
+    def getOverlayState(self):
+        # first, we ensure, that all values are in a valid range
+        self.__commandThrottle = min(max(self.__commandThrottle, -1.0), 1.0)
+        self.__actualThrottle = min(max(self.__actualThrottle, -1.0), 1.0)
+        self.__commandAngle = min(max(self.__commandAngle, -self.maxAngleRange), self.maxAngleRange)
+        self.__actualAngle = min(max(self.__actualAngle, -self.maxAngleRange), self.maxAngleRange)
+        return (self.__commandAngle, self.__commandThrottle, self.__actualAngle, self.__actualThrottle, self.maxAngleRange,
+                self.__cmdColor, self.__actColor, self.__cmdRef, self.__actRef)
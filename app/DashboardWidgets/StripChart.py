@@ -0,0 +1,130 @@
+import time
+import numpy as np
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+from PyQt5.QtCore import Qt, QPointF, QTimer, pyqtProperty
+from PyQt5.QtWidgets import QWidget
+from Core import DashboardWidget, DataField
+from Core.Datastore import datastore
+
+
+class StripChart(QWidget, DashboardWidget):
+    # memory layout of input data
+    inputFields = [
+        DataField('value', 'float32')
+    ]
+
+    # Note: by default, the chart plots its own input value. To plot an input field of another widget instead, set source
+    # to (widget, field_name), e.g. (self.rudderPlot, 'actualAngle'). The chart shows the last duration seconds and the
+    # y-axis range is [minimum, maximum] or the range of the data, if not given.
+    def __init__(self, duration=60.0, capacity=65536, minimum=None, maximum=None, source=None, refresh_rate=30.0, parent=None):
+        QWidget.__init__(self, parent=parent)
+        self.duration = float(duration)
+        self.minimum = minimum
+        self.maximum = maximum
+
+        # history of the plotted field, captured by the datastore (or a receiver process) on each received write
+        if source is None:
+            source = (self, 'value')
+        self.history = datastore.add_history(source[0], source[1], capacity)
+
+        # default colors (can be overridden via qproperty-<name> in stylesheets)
+        self.__lineColor = "#0066cc"
+        self.__backgroundColor = "#f7fbfe"
+        self.__gridColor = "#d4d9e2"
+
+        # the time axis moves, so the chart is repainted periodically
+        self.__refreshTimer = QTimer(self)
+        self.__refreshTimer.timeout.connect(self.update)
+        self.__refreshTimer.start(max(1, round(1000.0 / refresh_rate)))
+
+    # serialize output data to bytes
+    def packOutput(self):
+        return bytearray(0)  # no output data
+
+    # deserialize input data from bytes
+    # Note: the samples are captured by the history channel, so there is nothing to do here.
+    def unpackInput(self, data):
+        pass
+
+    # ---------------------- Qt properties for stylesheet control ----------------------
+    def getLineColor(self):
+        return self.__lineColor
+
+    def setLineColor(self, value):
+        if value == self.__lineColor:
+            return
+        self.__lineColor = value
+        self.update()
+
+    lineColor = pyqtProperty(str, fget=getLineColor, fset=setLineColor)
+
+    def getBackgroundColor(self):
+        return self.__backgroundColor
+
+    def setBackgroundColor(self, value):
+        if value == self.__backgroundColor:
+            return
+        self.__backgroundColor = value
+        self.update()
+
+    backgroundColor = pyqtProperty(str, fget=getBackgroundColor, fset=setBackgroundColor)
+
+    def getGridColor(self):
+        return self.__gridColor
+
+    def setGridColor(self, value):
+        if value == self.__gridColor:
+            return
+        self.__gridColor = value
+        self.update()
+
+    gridColor = pyqtProperty(str, fget=getGridColor, fset=setGridColor)
+
+    # decimate samples to the minimum and maximum value of each pixel column and return (columns, minima, maxima)
+    def __decimate(self, times, values, start_time, width):
+        columns = ((times - start_time) * (width / self.duration)).astype(np.int64)
+        np.clip(columns, 0, width - 1, out=columns)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(columns)) + 1))
+        return columns[starts], np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)
+
+    # paint event: this function is called, if the widget needs to be repainted
+    def paintEvent(self, e):
+        width = self.width()
+        height = self.height()
+        painter = QPainter(self)
+        painter.fillRect(0, 0, width, height, QColor(self.__backgroundColor))
+
+        # paint horizontal grid lines
+        painter.setPen(QPen(QColor(self.__gridColor), 1, Qt.DashLine))
+        for i in range(1, 4):
+            painter.drawLine(0, int(height * i / 4), width, int(height * i / 4))
+
+        # get all visible samples, ignoring invalid values
+        now = time.monotonic()
+        start_time = now - self.duration
+        times, values = self.history.get(start_time)
+        valid = np.isfinite(values)
+        times = times[valid]
+        values = values[valid]
+        if width < 2 or height < 2 or not values.size:
+            return
+
+        # paint cost only depends on the width: each pixel column is drawn as a vertical line from minimum to maximum
+        columns, minima, maxima = self.__decimate(times, values, start_time, width)
+        y_min = float(np.min(minima)) if self.minimum is None else float(self.minimum)
+        y_max = float(np.max(maxima)) if self.maximum is None else float(self.maximum)
+        if y_max <= y_min:
+            y_min -= 0.5
+            y_max += 0.5
+        scale = (height - 1) / (y_max - y_min)
+        y_top = np.clip((height - 1) - (maxima - y_min) * scale, 0, height - 1)
+        y_bottom = np.clip((height - 1) - (minima - y_min) * scale, 0, height - 1)
+        points = np.empty((2 * columns.size, 2))
+        points[0::2, 0] = columns
+        points[0::2, 1] = y_bottom
+        points[1::2, 0] = columns
+        points[1::2, 1] = y_top
+        polyline = QPolygonF([QPointF(x, y) for x, y in points.tolist()])
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor(self.__lineColor), 1.5, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        painter.drawPolyline(polyline)
@@ -1,12 +1,22 @@
 import math
-import numpy as np
 from PyQt5.QtGui import QPainter, QPen, QBrush, QColor
 from PyQt5.QtCore import Qt, pyqtProperty
 from PyQt5.QtWidgets import QWidget
-from Core import *
+from Core import DashboardWidget, DataField
+from Core.AsyncRenderer import LayeredWidget
 
 
-class VectorPlot(QWidget, DashboardWidget):
+class VectorPlot(LayeredWidget, QWidget, DashboardWidget):
+    # memory layout of input data
+    inputFields = [
+        DataField('commandRadius', 'float32', minimum=0.0, maximum=1.0),
+        DataField('commandAngle', 'float32'),
+        DataField('commandZ', 'float32', minimum=-1.0, maximum=1.0),
+        DataField('actualRadius', 'float32', minimum=0.0, maximum=1.0),
+        DataField('actualAngle', 'float32'),
+        DataField('actualZ', 'float32', minimum=-1.0, maximum=1.0)
+    ]
+
     def __init__(self, parent=None):
         QWidget.__init__(self, parent=parent)
 
@@ -28,28 +38,18 @@ class VectorPlot(QWidget, DashboardWidget):
         self.__rulerInnerSolid = "#d4d9e2"
         self.__borderColor = "#cad0d7"
 
-    # get memory size for input and output data
-    def requiredIODatastoreSize(self):
-        return (24, 0)  # input size, output size
+        # cached static layers and asynchronous rendering of frames, if it is enabled
+        LayeredWidget.__init__(self)
 
     # serialize output data to bytes
     def packOutput(self):
         return bytearray(0)  # no output data
 
-    # deserialize input data from bytes
-    def unpackInput(self, data):
-        if len(data) != 24:
-            return
-        self.__commandRadius = np.frombuffer(data[0:4], dtype=np.float32)[0]
-        self.__commandAngle = np.frombuffer(data[4:8], dtype=np.float32)[0]
-        self.__commandZ = np.frombuffer(data[8:12], dtype=np.float32)[0]
-        self.__actualRadius = np.frombuffer(data[12:16], dtype=np.float32)[0]
-        self.__actualAngle = np.frombuffer(data[16:20], dtype=np.float32)[0]
-        self.__actualZ = np.frombuffer(data[20:24], dtype=np.float32)[0]
-        self.__commandRadius = min(max(self.__commandRadius, 0.0), 1.0)
-        self.__commandZ = min(max(self.__commandZ, -1.0), 1.0)
-        self.__actualRadius = min(max(self.__actualRadius, 0.0), 1.0)
-        self.__actualZ = min(max(self.__actualZ, -1.0), 1.0)
+    # set the input data from the values of the input fields
+    def unpackInputValues(self, values):
+        (self.__commandRadius, self.__commandAngle, self.__commandZ,
+         self.__actualRadius, self.__actualAngle, self.__actualZ) = values
+        self.requestFrame()
 
 
     # ---------------------- Qt properties for stylesheet control ----------------------
@@ -82,7 +82,7 @@ class VectorPlot(QWidget, DashboardWidget):
         if value == self.__backgroundInner:
             return
         self.__backgroundInner = value
-        self.update()
+        self.invalidateStaticLayers()
 
     backgroundInner = pyqtProperty(str, fget=getBackgroundInner, fset=setBackgroundInner)
 
@@ -93,7 +93,7 @@ class VectorPlot(QWidget, DashboardWidget):
         if value == self.__backgroundRing:
             return
         self.__backgroundRing = value
-        self.update()
+        self.invalidateStaticLayers()
 
     backgroundRing = pyqtProperty(str, fget=getBackgroundRing, fset=setBackgroundRing)
 
@@ -104,7 +104,7 @@ class VectorPlot(QWidget, DashboardWidget):
         if value == self.__rulerOuter:
             return
         self.__rulerOuter = value
-        self.update()
+        self.invalidateStaticLayers()
 
     rulerOuter = pyqtProperty(str, fget=getRulerOuter, fset=setRulerOuter)
 
@@ -115,7 +115,7 @@ class VectorPlot(QWidget, DashboardWidget):
         if value == self.__rulerInnerDash:
             return
         self.__rulerInnerDash = value
-        self.update()
+        self.invalidateStaticLayers()
 
     rulerInnerDash = pyqtProperty(str, fget=getRulerInnerDash, fset=setRulerInnerDash)
 
@@ -126,7 +126,7 @@ class VectorPlot(QWidget, DashboardWidget):
         if value == self.__rulerInnerSolid:
             return
         self.__rulerInnerSolid = value
-        self.update()
+        self.invalidateStaticLayers()
 
     rulerInnerSolid = pyqtProperty(str, fget=getRulerInnerSolid, fset=setRulerInnerSolid)
 
@@ -137,18 +137,17 @@ class VectorPlot(QWidget, DashboardWidget):
         if value == self.__borderColor:
             return
         self.__borderColor = value
-        self.update()
+        self.invalidateStaticLayers()
 
     borderColor = pyqtProperty(str, fget=getBorderColor, fset=setBorderColor)
 
-    # paint Event: this function is called, if the widget is to be painted
-    def paintEvent(self, e):
-        # first, we ensure, that all values are in a valid range
-        self.__commandRadius = min(max(self.__commandRadius, 0.0), 1.0)
-        self.__commandZ = min(max(self.__commandZ, -1.0), 1.0)
-        self.__actualRadius = min(max(self.__actualRadius, 0.0), 1.0)
-        self.__actualZ = min(max(self.__actualZ, -1.0), 1.0)
+    # get the colors of the static layers
+    def getStaticLayersKey(self):
+        return (self.__backgroundInner, self.__backgroundRing, self.__rulerOuter, self.__rulerInnerDash, self.__rulerInnerSolid,
+                self.__borderColor)
 
+    # calculate all kinds of radii and line widths for the given widget size
+    def computeGeometry(self, width, height):
         # relative percentage of geometrical sizes with respect to maximum radius
         percentOuterBorder = 0.015
         percentInnerBorder = 0.012
@@ -156,13 +155,8 @@ class VectorPlot(QWidget, DashboardWidget):
         percentGridBorder = 0.01
         percentLineWidthThrust = 0.07
 
-        # create painter object and enable anti-aliasing
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
-
         # get maximum allowed radius for whole content
-        maxRadius = math.floor(min(painter.device().width(), painter.device().height()) / 2.0)
+        maxRadius = math.floor(min(width, height) / 2.0)
 
         # calculate all kinds of radii and line widths and ensure that some values are multiple values of 2 or 4
         center = maxRadius
@@ -178,6 +172,15 @@ class VectorPlot(QWidget, DashboardWidget):
         lineWidthThrustCMD = math.floor(maxRadius * percentLineWidthThrust)
         lineWidthThrustACT = math.floor(lineWidthThrustCMD / 2)
         rulerMaxRadius = innerRadius - innerBorder / 2 - lineWidthThrustCMD
+        return (center, outerBorder, outerRadius, ringDimension, innerBorder, innerRadius, lineWidthGrid,
+                lineWidthThrustCMD, lineWidthThrustACT, rulerMaxRadius)
+
+    # paint the static background: outer ring and inner circle with rulers
+    def paintBackground(self, painter, geometry):
+        (center, outerBorder, outerRadius, ringDimension, innerBorder, innerRadius, lineWidthGrid,
+         lineWidthThrustCMD, lineWidthThrustACT, rulerMaxRadius) = geometry
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
 
         # paint outer circle with ruler
         painter.setPen(Qt.NoPen)
@@ -203,19 +206,12 @@ class VectorPlot(QWidget, DashboardWidget):
         painter.drawLine(int(center - innerRadius), int(center), int(center + innerRadius), int(center))
         painter.drawLine(int(center), int(center - innerRadius), int(center), int(center + innerRadius))
 
-        # paint throttle vector (X,Y)
-        painter.setPen(QPen(QColor(self.__cmdColor), lineWidthThrustCMD, Qt.SolidLine, Qt.RoundCap))
-        painter.drawLine(int(center), int(center), int(center + math.sin(self.__commandAngle)*rulerMaxRadius*self.__commandRadius), int(center - math.cos(self.__commandAngle)*rulerMaxRadius*self.__commandRadius))
-        painter.drawPoint(int(center), int(center))
-        painter.setPen(QPen(QColor(self.__actColor), lineWidthThrustACT, Qt.SolidLine, Qt.RoundCap))
-        painter.drawLine(int(center), int(center), int(center + math.sin(self.__actualAngle)*rulerMaxRadius*self.__actualRadius), int(center - math.cos(self.__actualAngle)*rulerMaxRadius*self.__actualRadius))
-        painter.drawPoint(int(center), int(center))
-
-        # paint z throttle
-        painter.setPen(QPen(QColor(self.__cmdColor), ringDimension/2, Qt.SolidLine, Qt.FlatCap))
-        painter.drawArc(int(center - outerRadius + ringDimension/4), int(center - outerRadius + ringDimension/4), int(2*(innerRadius + 0.75*ringDimension)), int(2*(innerRadius + 0.75*ringDimension)), int(90*16), int(-180*16*self.__commandZ))
-        painter.setPen(QPen(QColor(self.__actColor), ringDimension/2, Qt.SolidLine, Qt.FlatCap))
-        painter.drawArc(int(center - innerRadius - ringDimension/4), int(center - innerRadius - ringDimension/4), int(2*(innerRadius + 0.25*ringDimension)), int(2*(innerRadius + 0.25*ringDimension)), int(90*16), int(-180*16*self.__actualZ))
+    # paint the static foreground: borders of inner and outer circle
+    def paintForeground(self, painter, geometry):
+        (center, outerBorder, outerRadius, ringDimension, innerBorder, innerRadius, lineWidthGrid,
+         lineWidthThrustCMD, lineWidthThrustACT, rulerMaxRadius) = geometry
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
 
         # borders (inner and outer circle)
         painter.setBrush(Qt.NoBrush)
@@ -224,3 +220,37 @@ class VectorPlot(QWidget, DashboardWidget):
         painter.drawEllipse(int(center-innerRadius), int(center-innerRadius), int(2*innerRadius), int(2*innerRadius))
         painter.setPen(QPen(QColor(self.__borderColor), outerBorder, Qt.SolidLine))
         painter.drawEllipse(int(center-outerRadius), int(center-outerRadius), int(2*outerRadius), int(2*outerRadius))
+
+    # paint the dynamic overlay for the given state (see getOverlayState()): command and actual vectors and z throttle
+    # Note: only the arguments are used, so that the overlay can be painted by a worker thread.
+    def paintOverlay(self, painter, geometry, state):
+        (center, outerBorder, outerRadius, ringDimension, innerBorder, innerRadius, lineWidthGrid,
+         lineWidthThrustCMD, lineWidthThrustACT, rulerMaxRadius) = geometry
+        commandRadius, commandAngle, commandZ, actualRadius, actualAngle, actualZ, cmdColor, actColor = state
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
+
+        # paint throttle vector (X,Y)
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(QColor(cmdColor), lineWidthThrustCMD, Qt.SolidLine, Qt.RoundCap))
+        painter.drawLine(int(center), int(center), int(center + math.sin(commandAngle)*rulerMaxRadius*commandRadius), int(center - math.cos(commandAngle)*rulerMaxRadius*commandRadius))
+        painter.drawPoint(int(center), int(center))
+        painter.setPen(QPen(QColor(actColor), lineWidthThrustACT, Qt.SolidLine, Qt.RoundCap))
+        painter.drawLine(int(center), int(center), int(center + math.sin(actualAngle)*rulerMaxRadius*actualRadius), int(center - math.cos(actualAngle)*rulerMaxRadius*actualRadius))
+        painter.drawPoint(int(center), int(center))
+
+        # paint z throttle
+        painter.setPen(QPen(QColor(cmdColor), ringDimension/2, Qt.SolidLine, Qt.FlatCap))
+        painter.drawArc(int(center - outerRadius + ringDimension/4), int(center - outerRadius + ringDimension/4), int(2*(innerRadius + 0.75*ringDimension)), int(2*(innerRadius + 0.75*ringDimension)), int(90*16), int(-180*16*commandZ))
+        painter.setPen(QPen(QColor(actColor), ringDimension/2, Qt.SolidLine, Qt.FlatCap))
+        painter.drawArc(int(center - innerRadius - ringDimension/4), int(center - innerRadius - ringDimension/4), int(2*(innerRadius + 0.25*ringDimension)), int(2*(innerRadius + 0.25*ringDimension)), int(90*16), int(-180*16*actualZ))
+
+    # get the state of the dynamic overlay: values and colors
+    def getOverlayState(self):
+        # first, we ensure, that all values are in a valid range
+        self.__commandRadius = min(max(self.__commandRadius, 0.0), 1.0)
+        self.__commandZ = min(max(self.__commandZ, -1.0), 1.0)
+        self.__actualRadius = min(max(self.__actualRadius, 0.0), 1.0)
+        self.__actualZ = min(max(self.__actualZ, -1.0), 1.0)
+        return (self.__commandRadius, self.__commandAngle, self.__commandZ, self.__actualRadius, self.__actualAngle,
+                self.__actualZ, self.__cmdColor, self.__actColor)
@@ -1,8 +1,17 @@
-# import all dashboard widgets here
-# the syntax is: from .<filename> import <classname>
+# register all dashboard widgets here, a widget module is imported on first use of its class
+# the syntax is: '<classname>': '<filename>'
+from Core.LazyRegistry import makeLazyRegistry
+from Core.StartupProfiler import startupProfiler
 
-from .PushButton import PushButton
-from .RudderPlot import RudderPlot
-from .VectorPlot import VectorPlot
-from .NumericDisplayInt32 import NumericDisplayInt32
-from .NumericDisplayFloat32 import NumericDisplayFloat32
+_widgetModules = {
+    'PushButton': 'PushButton',
+    'RudderPlot': 'RudderPlot',
+    'VectorPlot': 'VectorPlot',
+    'NumericDisplayInt32': 'NumericDisplayInt32',
+    'NumericDisplayFloat32': 'NumericDisplayFloat32',
+    'NumericTable': 'NumericTable',
+    'StripChart': 'StripChart'
+}
+
+# import the module of a widget class on first access, e.g. "from DashboardWidgets import PushButton"
+makeLazyRegistry(__name__, _widgetModules, on_import=startupProfiler.instrumentWidgetClass)
@@ -0,0 +1,246 @@
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+import numpy as np
+
+
+# struct format characters of the field data types, see Core/DataField.py
+FIELD_FORMATS = {
+    'int8': 'b',
+    'uint8': 'B',
+    'int16': 'h',
+    'uint16': 'H',
+    'int32': 'i',
+    'uint32': 'I',
+    'float32': 'f',
+    'float64': 'd'
+}
+
+
+# Thread that sends random input data for all widgets of a memory layout file with a given rate.
+class TrafficGenerator(threading.Thread):
+    # Note: if segments is greater than 1, the input data of that many widgets is sent as one multi-segment datagram.
+    def __init__(self, layout_filename, group, port, rate, interface=None, segments=1):
+        super().__init__(daemon=True)
+        with open(layout_filename, 'r') as f:
+            layout = json.load(f)
+        self.widgets = [entry for entry in layout if entry['input_size'] > 0]
+        self.group = group
+        self.port = int(port)
+        self.rate = float(rate)
+        self.segments = max(1, int(segments))
+        self.sentDatagrams = 0
+        self._running = threading.Event()
+        self._running.set()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        if interface:
+            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+    # create one message with random input data for a widget of the memory layout
+    def createMessage(self, entry):
+        offset, data = self.createSegment(entry)
+        return struct.pack('=I', offset) + data
+
+    # create one multi-segment message with random input data for several widgets of the memory layout
+    def createMultiSegmentMessage(self, entries):
+        message = struct.pack('=IH', 0xFFFFFFFF, len(entries))
+        for entry in entries:
+            offset, data = self.createSegment(entry)
+            message += struct.pack('=IH', offset, len(data)) + data
+        return message
+
+    # create random input data (offset, bytes) for a widget of the memory layout
+    def createSegment(self, entry):
+        data = bytearray(entry['input_size'])
+        for field in entry.get('input_fields', []):
+            fmt = '=' + str(field['count']) + FIELD_FORMATS[field['type']]
+            if field['type'].startswith('float'):
+                values = [random.uniform(field.get('minimum', -math.pi), field.get('maximum', math.pi)) for _ in range(field['count'])]
+            else:
+                size = struct.calcsize(fmt) // field['count']
+                values = [random.randrange(0, 256) if size == 1 else random.randrange(-1000, 1000) for _ in range(field['count'])]
+                if field['type'].startswith('uint'):
+                    values = [abs(value) for value in values]
+            struct.pack_into(fmt, data, field['offset'] - entry['input_offset'], *values)
+        return entry['input_offset'], bytes(data)
+
+    # thread entry point: send messages on a fixed schedule, cycling through all widgets
+    def run(self):
+        if not self.widgets or self.rate <= 0:
+            return
+        if self.segments > 1:
+            entries = self.widgets * 4
+            messages = [self.createMultiSegmentMessage(entries[i:i + self.segments]) for i in range(0, len(entries), self.segments)]
+        else:
+            messages = [self.createMessage(entry) for entry in self.widgets for _ in range(4)]
+        period = 1.0 / self.rate
+        next_time = time.monotonic()
+        index = 0
+        while self._running.is_set():
+            try:
+                self._sock.sendto(messages[index], (self.group, self.port))
+                self.sentDatagrams += 1
+            except OSError:
+                pass
+            index = (index + 1) % len(messages)
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def stop(self):
+        self._running.clear()
+
+
+# get a dictionary with percentiles of a list of durations given in seconds
+def percentiles(durations):
+    if not durations:
+        return {}
+    values = np.array(durations) * 1000.0
+    return {
+        'count': int(values.size),
+        'mean_ms': float(np.mean(values)),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p90_ms': float(np.percentile(values, 90)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(np.max(values))
+    }
+
+
+# create a dashboard with a given number of widgets, the widget classes are used round-robin
+def createDashboard(widget_classes, num_widgets):
+    from Core.DashboardLoader import buildDashboard
+    num_columns = max(1, math.ceil(math.sqrt(num_widgets)))
+    widgets = []
+    for i in range(num_widgets):
+        entry = {'type': widget_classes[i % len(widget_classes)], 'row': i // num_columns, 'column': i % num_columns}
+        if entry['type'] == 'PushButton':
+            entry['args'] = ["Button " + str(i)]
+        widgets.append(entry)
+    return buildDashboard({'widgets': widgets})
+
+
+# run the benchmark and return the report as dictionary
+def runBenchmark(args):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    from main import MainWindow
+    from Core.Datastore import datastore
+
+    app = QApplication([])
+    with open("style.css", "r") as f:
+        app.setStyleSheet(f.read())
+    dashboard = None
+    if args.num_widgets > 0:
+        dashboard = createDashboard(args.widgets.split(','), args.num_widgets)
+    window = MainWindow(dashboard=dashboard, group=args.group, local_port=args.port, dest_port=args.dest_port,
+                        render_rate=args.render_rate, output_rate=args.output_rate)
+
+    # measure the duration of each render tick
+    tick_durations = []
+    def timedRenderTick():
+        t0 = time.perf_counter()
+        window.onRenderTick()
+        tick_durations.append(time.perf_counter() - t0)
+    window.scheduler.renderTick.disconnect()
+    window.scheduler.renderTick.connect(timedRenderTick)
+
+    # measure the paint duration of each widget class
+    paint_durations = {}
+    for widget in datastore.widgets:
+        durations = paint_durations.setdefault(widget.__class__.__name__, [])
+        def timedPaintEvent(event, widget=widget, durations=durations):
+            t0 = time.perf_counter()
+            type(widget).paintEvent(widget, event)
+            durations.append(time.perf_counter() - t0)
+        widget.paintEvent = timedPaintEvent
+
+    # measure the time between two sent outputs
+    send_times = []
+    send_output_data = window.networkManager.sendOutputData
+    def timedSendOutputData():
+        send_times.append(time.perf_counter())
+        send_output_data()
+    window.networkManager.sendOutputData = timedSendOutputData
+
+    window.show()
+    generator = TrafficGenerator("memoryLayout.json", args.group, args.port, args.rate, args.interface, args.segments)
+    QTimer.singleShot(int(args.warmup * 1000), generator.start)
+    QTimer.singleShot(int((args.warmup + args.duration) * 1000), app.quit)
+    app.exec()
+    generator.stop()
+    generator.join(1.0)
+    time.sleep(0.2)
+    window.close()
+
+    received = window.networkManager.receivedDatagrams
+    return {
+        'widgets': len(datastore.widgets),
+        'duration_s': args.duration,
+        'sent_datagrams': generator.sentDatagrams,
+        'received_datagrams': received,
+        'dropped_datagrams': max(0, generator.sentDatagrams - received),
+        'received_datagrams_per_s': received / args.duration,
+        'received_bytes_per_s': window.networkManager.receivedBytes / args.duration,
+        'tick': percentiles(tick_durations),
+        'render_overruns': window.scheduler.renderOverruns,
+        'dropped_frames': window.scheduler.droppedFrames,
+        'output_overruns': window.scheduler.outputOverruns,
+        'paint': {name: percentiles(durations) for name, durations in paint_durations.items()},
+        'send_jitter': percentiles([abs(b - a - window.scheduler.outputPeriod) for a, b in zip(send_times, send_times[1:])])
+    }
+
+
+# print a report in human-readable form
+def printReport(report):
+    print("widgets:              %d" % report['widgets'])
+    print("sent datagrams:       %d" % report['sent_datagrams'])
+    print("received datagrams:   %d (%.1f/s, %.1f kB/s)" % (report['received_datagrams'], report['received_datagrams_per_s'], report['received_bytes_per_s'] / 1000.0))
+    print("dropped datagrams:    %d" % report['dropped_datagrams'])
+    print("render overruns:      %d (%d dropped frames)" % (report['render_overruns'], report['dropped_frames']))
+    print("output overruns:      %d" % report['output_overruns'])
+    rows = [('tick', report['tick']), ('send jitter', report['send_jitter'])]
+    rows += [('paint ' + name, stats) for name, stats in sorted(report['paint'].items())]
+    print("%-32s %8s %9s %9s %9s %9s" % ('', 'count', 'p50 [ms]', 'p90 [ms]', 'p99 [ms]', 'max [ms]'))
+    for name, stats in rows:
+        if stats:
+            print("%-32s %8d %9.3f %9.3f %9.3f %9.3f" % (name, stats['count'], stats['p50_ms'], stats['p90_ms'], stats['p99_ms'], stats['max_ms']))
+
+
+# If this python script is executed, then the following code is executed.
+if __name__ == "__main__":
+    # change the executable path to the folder of this script
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Headless load test of the receive, datastore and render loop.")
+    parser.add_argument('--duration', type=float, default=10.0, help="measurement duration in seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="warmup duration in seconds before traffic starts")
+    parser.add_argument('--rate', type=float, default=1000.0, help="number of input datagrams per second")
+    parser.add_argument('--segments', type=int, default=1, help="number of widgets updated by one multi-segment input datagram")
+    parser.add_argument('--num-widgets', type=int, default=0, help="number of generated widgets, 0 uses Dashboard.py")
+    parser.add_argument('--widgets', default='PushButton,VectorPlot,RudderPlot,NumericDisplayInt32,NumericDisplayFloat32', help="comma-separated widget classes of the generated dashboard")
+    parser.add_argument('--render-rate', type=float, default=60.0, help="rate in Hz to render widgets")
+    parser.add_argument('--output-rate', type=float, default=60.0, help="rate in Hz to send output data")
+    parser.add_argument('--group', default='239.192.168.11', help="multicast group")
+    parser.add_argument('--port', type=int, default=11077, help="local port of pingui")
+    parser.add_argument('--dest-port', type=int, default=11088, help="destination port of pingui")
+    parser.add_argument('--interface', default=None, help="IP address of the interface to send multicast traffic, e.g. 127.0.0.1")
+    parser.add_argument('--json', default=None, help="write the report to this json file")
+    args = parser.parse_args()
+
+    report = runBenchmark(args)
+    printReport(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
@@ -1,57 +1,239 @@
-from PyQt5.QtWidgets import QApplication, QMainWindow
-from PyQt5.QtCore import QTimer
-from Dashboard import Dashboard
-from Core import *
+import sys
+from Core.StartupProfiler import startupProfiler
+with startupProfiler.phase('import PyQt5'):
+    from PyQt5.QtWidgets import QApplication, QMainWindow, QShortcut
+    from PyQt5.QtCore import QTimer, Qt
+    from PyQt5.QtGui import QKeySequence
+from Core import Endpoint, FrameScheduler, MainDashboard, NetworkManager
 from Core.Datastore import datastore
+from Core.Metrics import metrics
 
+# a thread that waits for the GIL gets it after at most 1 ms instead of the default 5 ms, so that the sender thread meets
+# its deadlines and the GUI thread handles input while a worker thread renders frames
+# Note: this is also executed by a receiver process, which imports this script as its main module.
+sys.setswitchinterval(min(sys.getswitchinterval(), 0.001))
 
 # The main window class is created, when this script is executed, see bottom of the script
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # Note: an optional dashboard can be given instead of the default Dashboard defined in Dashboard.py.
+    # Widgets are rendered with render_rate and output data is sent with output_rate (in Hz).
+    # The process_mode is either 'thread' (receive and send in a thread of this process), 'receiver' (move the datastore
+    # to shared memory and receive and send in a separate process), 'attach' (display the shared memory of another
+    # pingui process without own network communication and output data) or 'replay' (replay the datagram log file
+    # replay with replay_speed from replay_start seconds without receiving, output data is only sent if replay_output is
+    # True). The shared_memory_name is the name of the shared memory to create or to attach to. An optional list of
+    # endpoints replaces group, local_port and dest_port, see Endpoint in Core/NetworkManager.py. If announce_layout is
+    # True, the hash of the memory layout is announced to the destination periodically. The output_mode,
+    # keepalive_period, max_message_size and frame_id are passed to the network manager, see Core/NetworkManager.py.
+    def __init__(self, dashboard=None, group='239.192.168.11', local_port=11077, dest_port=11088, render_rate=60.0, output_rate=60.0, process_mode='thread', shared_memory_name=None, record=None, endpoints=None, announce_layout=False, replay=None, replay_speed=1.0, replay_start=0.0, replay_output=False, output_mode='full', keepalive_period=1.0, max_message_size=None, frame_id=False):
         super().__init__()
-        self.widgetDashboard = Dashboard(self)
+        if dashboard is None:
+            # the default dashboard (and its widget modules) is only imported if no other dashboard is given
+            with startupProfiler.phase('create dashboard'):
+                from Dashboard import Dashboard
+                dashboard = Dashboard(self)
+        self.widgetDashboard = dashboard
         self.setCentralWidget(self.widgetDashboard)
-        self.setWindowTitle("Title")
+        self.setWindowTitle(self.widgetDashboard.windowTitle() or "Title")
         self.resize(1280, 800)
         # self.setFixedSize(1280,800)
         # self.showFullScreen()
 
-        # save the current memory layout to a json file
-        datastore.write_layout_to_file("memoryLayout.json")
+        # allocate the memory of all widgets at once and save the memory layout to a json file (if it changed)
+        with startupProfiler.phase('write memory layout'):
+            datastore.allocate()
+            datastore.write_layout_to_file("memoryLayout.json")
 
-        # create and start the network manager thread
-        self.networkManager = NetworkManager(group='239.192.168.11', local_port=11077, dest_port=11088)
-        self.networkManager.start()
+        # each snapshot of the input data is decoded as a whole, widgets read their clamped values from typed views
+        datastore.enable_decoding()
 
-        # 60 Hz timer (approx. 16 ms interval)
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.onTick)
-        self.timer.start(16)
+        # create and start the network manager thread, output data is sent by its own sender thread
+        self.processMode = process_mode
+        self.networkManager = None
+        self.sharedMemoryName = None
+        self.replayer = None
+        self.__receiverExited = False
+        output_args = dict(send_rate=output_rate, output_mode=output_mode, keepalive_period=keepalive_period, max_message_size=max_message_size, frame_id=frame_id, announce_layout=announce_layout)
+        if process_mode == 'thread':
+            self.networkManager = NetworkManager(group=group, local_port=local_port, dest_port=dest_port, endpoints=endpoints, **output_args)
+            if record:
+                self.networkManager.startRecording(record)
+            self.networkManager.start()
+        elif process_mode == 'receiver':
+            from Core import ReceiverProcess
+            self.sharedMemoryName = datastore.share_memory(shared_memory_name)
+            self.networkManager = ReceiverProcess(self.sharedMemoryName, record=record, group=group, local_port=local_port, dest_port=dest_port, endpoints=endpoints, **output_args)
+            self.networkManager.start()
+        elif process_mode == 'attach':
+            self.sharedMemoryName = shared_memory_name
+            datastore.attach_shared_memory(shared_memory_name, display_only=True)
+        elif process_mode == 'replay':
+            # live datagrams must not interleave with the replayed ones: no receive sockets are opened, the replay parses
+            # the datagrams with a (not started) network manager with the same endpoints
+            from Core import DatagramReplayer
+            parser = NetworkManager(group=group, local_port=local_port, dest_port=dest_port, endpoints=endpoints)
+            self.replayer = DatagramReplayer(replay, parser.parseEndpointDatagram, speed=replay_speed)
+            self.replayer.seek(replay_start)
+            if replay_output:
+                self.networkManager = NetworkManager(group=group, local_port=local_port, dest_port=dest_port, endpoints=endpoints, receive=False, **output_args)
+                self.networkManager.start()
+            self.replayer.start()
+        else:
+            raise ValueError("Unknown process mode '" + str(process_mode) + "'")
 
-    def onTick(self):
+        # independent render and output packing cadences (default: 60 Hz, approx. 16 ms interval)
+        self.scheduler = FrameScheduler(render_rate=render_rate, output_rate=output_rate, parent=self)
+        self.scheduler.renderTick.connect(self.onRenderTick)
+        if self.networkManager is not None:
+            self.scheduler.outputTick.connect(self.onOutputTick)
+        self.scheduler.start()
+
+        # widgets that became visible catch up immediately instead of waiting for the next render tick
+        # Note: the connection is queued, so that the layout of a newly shown page is updated before.
+        self.__outputPacked = False
+        if isinstance(self.widgetDashboard, MainDashboard):
+            self.widgetDashboard.visibleWidgetsChanged.connect(self.refreshWidgets, Qt.QueuedConnection)
+
+        # collect runtime metrics periodically, the overlay is toggled with F12
+        if metrics.enabled:
+            from Core import MetricsOverlay
+            self.metricsOverlay = MetricsOverlay(self)
+            QShortcut(QKeySequence(Qt.Key_F12), self, self.metricsOverlay.toggle)
+            self.metricsTimer = QTimer(self)
+            self.metricsTimer.timeout.connect(self.onMetricsTick)
+            self.metricsTimer.start(int(metrics.period * 1000))
+
+    def onRenderTick(self):
+        metrics.recordTick(self.scheduler.renderPeriod)
+        self.checkReceiverProcess()
+        self.refreshWidgets()
+
+    # detect a receiver process that exited unexpectedly, e.g. crashed during a write to the shared memory, which would
+    # keep the shared memory in an inconsistent state for all readers
+    def checkReceiverProcess(self):
+        if self.processMode != 'receiver' or self.__receiverExited or self.networkManager.is_alive():
+            return
+        self.__receiverExited = True
+        datastore.recover_interrupted_write()
+        print("receiver process exited with code " + str(self.networkManager.exitcode), file=sys.stderr)
+
+    # take one snapshot of the input data and only unpack and repaint visible widgets whose input data changed
+    # Note: invisible widgets, e.g. on hidden pages or scrolled out of view, keep their input generation and thus catch
+    # up with a single update once they are visible again.
+    def refreshWidgets(self):
+        if self.isMinimized():
+            return
+        snapshot = datastore.snapshot_input()
+        for widget, generation in datastore.get_changed_widgets():
+            if widget.isVisible() and not widget.visibleRegion().isEmpty():
+                widget.updateFromDatastore(snapshot, generation)
+
+    def onOutputTick(self):
+        # output data is packed for all visible widgets, because it may change due to user interaction
+        # Note: invisible widgets cannot be used, their last output data is kept. All widgets are packed once initially.
+        # The output data is sent by the sender thread of the network manager.
+        pack_all = not self.__outputPacked
+        self.__outputPacked = True
         for widget in datastore.widgets:
-            widget.updateFromDatastore()
-        self.networkManager.sendOutputData()
+            if pack_all or widget.isVisible():
+                widget.updateOutputToDatastore()
+
+    def onMetricsTick(self):
+        metrics.collect([self.networkManager] if self.networkManager else [])
+        self.metricsOverlay.refresh()
 
     def closeEvent(self, event):
-        self.timer.stop()
-        self.networkManager.stop()
+        self.scheduler.stop()
+        if self.replayer:
+            self.replayer.stop()
+        if self.networkManager:
+            self.networkManager.stop()
+        datastore.close_shared_memory(unlink=(self.processMode == 'receiver'))
+        from Core.AsyncRenderer import asyncRenderer
+        asyncRenderer.stop()
         super().closeEvent(event)
 
 
+# parse an endpoint given as GROUP:LOCAL_PORT:DEST_PORT[:INPUT_OFFSET[:OUTPUT_OFFSET[:OUTPUT_SIZE[:INPUT_SIZE]]]]
+def parseEndpoint(text):
+    import argparse
+    parts = text.split(':')
+    if not 3 <= len(parts) <= 7:
+        raise argparse.ArgumentTypeError("invalid endpoint '" + text + "'")
+    try:
+        return Endpoint(parts[0], *[int(part) for part in parts[1:]])
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid endpoint '" + text + "'")
+
+
 # If this python script is executed, then the following code is executed.
 if __name__ == "__main__":
     # change the executable path to the folder of this script
+    import argparse
     import os
-    import sys
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+    # parse command line arguments
+    parser = argparse.ArgumentParser(description="pingui dashboard application")
+    parser.add_argument('--metrics', action='store_true', help="enable runtime metrics (toggle the overlay with F12)")
+    parser.add_argument('--metrics-period', type=float, default=1.0, help="period in seconds to collect runtime metrics")
+    parser.add_argument('--metrics-export', default=None, help="export runtime metrics as json to 'file:<filename>' or 'udp:<host>:<port>'")
+    parser.add_argument('--record', default=None, help="append all received datagrams to this log file")
+    parser.add_argument('--replay', default=None, help="replay the datagrams of this log file")
+    parser.add_argument('--replay-speed', type=float, default=1.0, help="replay speed, e.g. 1 for real-time, 0 for as fast as possible")
+    parser.add_argument('--replay-start', type=float, default=0.0, help="time in seconds from where to start the replay")
+    parser.add_argument('--replay-output', action='store_true', help="send output data to the network during a replay (not sent by default)")
+    parser.add_argument('--render-rate', type=float, default=60.0, help="rate in Hz to render widgets")
+    parser.add_argument('--output-rate', type=float, default=60.0, help="rate in Hz to send output data")
+    parser.add_argument('--output-mode', choices=('full', 'delta'), default='full', help="send the entire output data each time (full) or only its changed regions (delta)")
+    parser.add_argument('--keepalive-period', type=float, default=1.0, help="period in seconds to send the entire output data in delta mode and to announce the memory layout")
+    parser.add_argument('--max-message-size', type=int, default=None, help="split the output data into messages of at most this number of bytes")
+    parser.add_argument('--frame-id', action='store_true', help="send all messages of one output as fragments of a frame with a common frame id")
+    parser.add_argument('--async-render', action='store_true', help="render plot widgets on a worker thread, paint events only blit the rendered frames")
+    parser.add_argument('--endpoint', dest='endpoints', action='append', type=parseEndpoint, default=None, metavar='GROUP:LOCAL_PORT:DEST_PORT[:INPUT_OFFSET[:OUTPUT_OFFSET[:OUTPUT_SIZE[:INPUT_SIZE]]]]', help="network endpoint mapped to a region of the datastore, can be given several times")
+    parser.add_argument('--dashboard', default=None, help="load the dashboard from this JSON or YAML file instead of Dashboard.py")
+    parser.add_argument('--announce-layout', action='store_true', help="periodically send the hash of the memory layout to the destination")
+    parser.add_argument('--profile-startup', action='store_true', help="print the durations of imports, widget construction and startup phases")
+    parser.add_argument('--receiver-process', action='store_true', help="receive and send in a separate process that shares the datastore via shared memory")
+    parser.add_argument('--shared-memory', default=None, help="name of the shared memory created with --receiver-process")
+    parser.add_argument('--attach', default=None, metavar='NAME', help="display the shared memory of another pingui process started with --receiver-process")
+    args = parser.parse_args()
+    if args.replay and (args.receiver_process or args.attach):
+        parser.error("--replay cannot be combined with --receiver-process or --attach")
+    if args.record and (args.attach or args.replay):
+        parser.error("--record cannot be combined with --attach or --replay")
+    if args.replay_output and not args.replay:
+        parser.error("--replay-output requires --replay")
+    if args.metrics or args.metrics_export:
+        metrics.enable(period=args.metrics_period, export_target=args.metrics_export)
+    if args.profile_startup:
+        startupProfiler.enable()
+    if args.async_render:
+        from Core.AsyncRenderer import asyncRenderer
+        asyncRenderer.enable()
+
     # create the application and main window
-    app = QApplication([])
-    with open("style.css", "r") as f:
-        _style = f.read()
-        app.setStyleSheet(_style)
-    window = MainWindow()
+    with startupProfiler.phase('create application'):
+        app = QApplication([])
+        with open("style.css", "r") as f:
+            _style = f.read()
+            app.setStyleSheet(_style)
+    if args.replay:
+        process_mode = 'replay'
+    else:
+        process_mode = 'attach' if args.attach else ('receiver' if args.receiver_process else 'thread')
+    dashboard = None
+    if args.dashboard:
+        with startupProfiler.phase('load dashboard'):
+            from Core.DashboardLoader import loadDashboard
+            dashboard = loadDashboard(args.dashboard)
+    window = MainWindow(dashboard=dashboard, render_rate=args.render_rate, output_rate=args.output_rate, process_mode=process_mode, shared_memory_name=args.attach or args.shared_memory, record=args.record, endpoints=args.endpoints, announce_layout=args.announce_layout, replay=args.replay, replay_speed=args.replay_speed, replay_start=args.replay_start, replay_output=args.replay_output, output_mode=args.output_mode, keepalive_period=args.keepalive_period, max_message_size=args.max_message_size, frame_id=args.frame_id)
+    if window.processMode == 'receiver':
+        print("shared memory: " + window.sharedMemoryName)
     window.show()
+
+    # print the startup profile once the event loop runs, e.g. after the window has been shown
+    if startupProfiler.enabled:
+        QTimer.singleShot(0, lambda: print(startupProfiler.formatReport()))
     app.exec()